@@ -0,0 +1,614 @@
+"""
+File containing code for the bitboard position backend.
+Author: Thomas Mortier
+Date: October 2026
+
+A position is represented by one 64-bit integer per component (indexed by the
+same component codes as the numpy state, ie, 1-6 black and 7-12 white), two
+colour occupancy masks and a 64-square mailbox for fast component lookups.
+Square sq corresponds to state coordinate (sq//8, sq%8).
+"""
+import numpy as np
+
+from simplechess.zobrist import COMPONENT_KEYS, CASTLE_KEYS, EP_KEYS, COLOR_KEY
+from simplechess.tables import N, S, E, W, NE, NW, SE, SW, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS, BETWEEN
+from simplechess.evaluation import PSQT, PSQT_ENDGAME, PHASE, PHASE_TOTAL, taper
+
+BLACK, WHITE = 0, 1
+COLORS = ["black", "white"]
+
+FULL = (1 << 64)-1
+# points for captured components (index: component type, ie, (component-1)%6)
+POINTS = [1, 5, 3, 3, 9, 3]
+# component type offsets for promotion options (0=bishop, 1=knight, 2=rook, 3=queen)
+PROMOTIONS = [4, 3, 2, 5]
+# corner squares and the castle flag of their rook
+CORNERS = {0: 0, 7: 2, 56: 3, 63: 5}
+# moves are interned, ie, MOVES[from][to] and PROMOTION_MOVES[from*64+to][promotion] hold the (from, to, promotion)-tuples,
+# such that generating a move does not allocate and equal moves mostly are the same object
+MOVES = [[(frm, to, None) for to in range(64)] for frm in range(64)]
+PROMOTION_MOVES = {frm*64+to: [(frm, to, po) for po in range(4)]
+                   for frm in list(range(8, 16))+list(range(48, 56)) for to in range(64) if abs((to >> 3)-(frm >> 3)) == 1 and (to >> 3) in (0, 7) and abs((to & 7)-(frm & 7)) <= 1}
+
+def _positiveRay(d, sq, occ):
+    ray = RAYS[d][sq]
+    blockers = ray & occ
+    if blockers:
+        # cut the ray behind the first blocker (least significant bit)
+        ray ^= RAYS[d][(blockers & -blockers).bit_length()-1]
+    return ray
+
+def _negativeRay(d, sq, occ):
+    ray = RAYS[d][sq]
+    blockers = ray & occ
+    if blockers:
+        # cut the ray behind the first blocker (most significant bit)
+        ray ^= RAYS[d][blockers.bit_length()-1]
+    return ray
+
+def rookAttacks(sq, occ):
+    return _positiveRay(S, sq, occ) | _positiveRay(E, sq, occ) | _negativeRay(N, sq, occ) | _negativeRay(W, sq, occ)
+
+def bishopAttacks(sq, occ):
+    return _positiveRay(SE, sq, occ) | _positiveRay(SW, sq, occ) | _negativeRay(NE, sq, occ) | _negativeRay(NW, sq, occ)
+
+def lsb(b):
+    return (b & -b).bit_length()-1
+
+def iterBits(b):
+    while b:
+        low = b & -b
+        yield low.bit_length()-1
+        b ^= low
+
+def packMove(move):
+    # (from, to, promotion)-move as integer, 0 denotes no move
+    return move[0] | move[1] << 6 | (0 if move[2] is None else move[2]+1) << 12
+
+def unpackMove(code):
+    po = code >> 12
+    frm, to = code & 63, (code >> 6) & 63
+    if po == 0:
+        return MOVES[frm][to]
+    return PROMOTION_MOVES.get(frm*64+to, [(frm, to, p) for p in range(4)])[po-1]
+
+def toCoord(sq):
+    return (sq >> 3, sq & 7)
+
+def toSquare(coord):
+    return coord[0]*8+coord[1]
+
+class Position:
+    def __init__(self, orientation="white"):
+        self.orientation = orientation
+        # colour whose pawns move towards row 0 (ie, the colour of the player)
+        self.up = WHITE if orientation == "white" else BLACK
+        self.bb = [0]*13
+        self.occ = [0, 0]
+        self.board = [0]*64
+        self.color = WHITE
+        self.ep = None
+        self.castle = [False]*6
+        self.score = [0, 0]
+        # material plus piece-square values (in centipawns) per colour for the middlegame and endgame, number of
+        # components (index: component) and game phase, kept up to date incrementally
+        self.psqt_table = PSQT[self.up]
+        self.psqt_endgame_table = PSQT_ENDGAME[self.up]
+        self.psqt = [0, 0]
+        self.psqt_endgame = [0, 0]
+        self.counts = [0]*13
+        self.phase = 0
+        # Zobrist key of state, castle, ep and player to move
+        self.key = COLOR_KEY
+
+    @classmethod
+    def fromState(cls, state, orientation, ep=None, castle=None, color="white", score=None):
+        """
+        Arguments:
+            state : numpy (8,8) state of game
+            orientation : orientation of the game
+            ep : state for en-passant (position of pawn which made a double step)
+            castle : state for castling
+            color : color of the player to move
+            score : list of scores for both opponents
+        Return:
+            pos : Position instance
+        """
+        pos = cls(orientation)
+        for sq, p in enumerate(np.asarray(state).ravel().tolist()):
+            if p:
+                pos.putComponent(p, sq)
+        pos.color = WHITE if color == "white" else BLACK
+        pos.ep = (toSquare(ep) if ep is not None else None)
+        pos.castle = (list(castle) if castle is not None else [False]*6)
+        pos.score = (list(score) if score is not None else [0, 0])
+        pos.key = pos.computeKey()
+        return pos
+
+    def toState(self):
+        return np.array(self.board, dtype=int).reshape(8, 8)
+
+    def copy(self):
+        pos = Position.__new__(Position)
+        pos.orientation = self.orientation
+        pos.up = self.up
+        pos.bb = self.bb[:]
+        pos.occ = self.occ[:]
+        pos.board = self.board[:]
+        pos.color = self.color
+        pos.ep = self.ep
+        pos.castle = self.castle[:]
+        pos.score = self.score[:]
+        pos.psqt_table = self.psqt_table
+        pos.psqt_endgame_table = self.psqt_endgame_table
+        pos.psqt = self.psqt[:]
+        pos.psqt_endgame = self.psqt_endgame[:]
+        pos.counts = self.counts[:]
+        pos.phase = self.phase
+        pos.key = self.key
+        return pos
+
+    def computeKey(self):
+        key = (COLOR_KEY if self.color == WHITE else 0)
+        for sq, p in enumerate(self.board):
+            if p:
+                key ^= COMPONENT_KEYS[p][sq]
+        for i, moved in enumerate(self.castle):
+            if moved:
+                key ^= CASTLE_KEYS[i]
+        if self.ep is not None:
+            key ^= EP_KEYS[self.ep]
+        return key
+
+    def putComponent(self, p, sq):
+        b = 1 << sq
+        self.bb[p] |= b
+        self.occ[(p-1)//6] |= b
+        self.board[sq] = p
+        c = (p-1)//6
+        self.psqt[c] += self.psqt_table[p][sq]
+        self.psqt_endgame[c] += self.psqt_endgame_table[p][sq]
+        self.counts[p] += 1
+        self.phase += PHASE[p]
+        self.key ^= COMPONENT_KEYS[p][sq]
+
+    def removeComponent(self, sq):
+        p = self.board[sq]
+        b = 1 << sq
+        self.bb[p] &= ~b
+        self.occ[(p-1)//6] &= ~b
+        self.board[sq] = 0
+        c = (p-1)//6
+        self.psqt[c] -= self.psqt_table[p][sq]
+        self.psqt_endgame[c] -= self.psqt_endgame_table[p][sq]
+        self.counts[p] -= 1
+        self.phase -= PHASE[p]
+        self.key ^= COMPONENT_KEYS[p][sq]
+        return p
+
+    def occupancy(self):
+        return self.occ[0] | self.occ[1]
+
+    def attacksFrom(self, sq, p):
+        # attack set of component p located at sq (pawn pushes excluded)
+        t = (p-1) % 6
+        if t == 0:
+            return PAWN_ATTACKS[(p-1)//6 == self.up][sq]
+        elif t == 1:
+            return rookAttacks(sq, self.occupancy())
+        elif t == 2:
+            return KNIGHT_ATTACKS[sq]
+        elif t == 3:
+            return bishopAttacks(sq, self.occupancy())
+        elif t == 4:
+            return rookAttacks(sq, self.occupancy()) | bishopAttacks(sq, self.occupancy())
+        return KING_ATTACKS[sq]
+
+    def attackers(self, sq, attacker, occ=None):
+        """
+        Arguments:
+            sq : square of interest
+            attacker : color index of attacking side
+            occ : occupancy to use for sliding components (defaults to current occupancy)
+        Return:
+            bitboard of components of attacker which attack sq
+        """
+        o = 6*attacker
+        bb = self.bb
+        if occ is None:
+            occ = self.occupancy()
+        # look outwards from sq with each component pattern
+        att = PAWN_ATTACKS[attacker != self.up][sq] & bb[o+1]
+        att |= KNIGHT_ATTACKS[sq] & bb[o+3]
+        att |= KING_ATTACKS[sq] & bb[o+6]
+        queens = bb[o+5]
+        att |= rookAttacks(sq, occ) & (bb[o+2] | queens)
+        att |= bishopAttacks(sq, occ) & (bb[o+4] | queens)
+        return att
+
+    def isSquareAttacked(self, sq, attacker, occ=None):
+        # same patterns as attackers, but stops at the first attacker found (cheapest patterns first)
+        o = 6*attacker
+        bb = self.bb
+        if KNIGHT_ATTACKS[sq] & bb[o+3] or PAWN_ATTACKS[attacker != self.up][sq] & bb[o+1] or KING_ATTACKS[sq] & bb[o+6]:
+            return True
+        if occ is None:
+            occ = self.occ[0] | self.occ[1]
+        queens = bb[o+5]
+        rq = bb[o+2] | queens
+        if rq and rookAttacks(sq, occ) & rq:
+            return True
+        bq = bb[o+4] | queens
+        return bool(bq and bishopAttacks(sq, occ) & bq)
+
+    def isAttacked(self, squares, attacker):
+        for sq in squares:
+            if self.isSquareAttacked(sq, attacker):
+                return True
+        return False
+
+    def kingSquare(self, color):
+        return lsb(self.bb[6+6*color])
+
+    def isChecked(self, color):
+        k = self.bb[6+6*color]
+        return k != 0 and self.isSquareAttacked(lsb(k), 1-color)
+
+    def getComponents(self, color):
+        return [toCoord(sq) for sq in iterBits(self.occ[color])]
+
+    def getValidPositions(self, coord):
+        sq = toSquare(coord)
+        return [toCoord(m[1]) for m in self.generateMoves((self.board[sq]-1)//6, 1 << sq) if m[2] in (None, 3)]
+
+    def generateMoves(self, color=None, frommask=FULL, promotions=(3,), capturesonly=False, moves=None):
+        """
+        Generate pseudo-legal moves.
+
+        Arguments:
+            color : color index of side to move (defaults to self.color)
+            frommask : bitboard restricting the origin squares
+            promotions : promotion options to generate (0=bishop, 1=knight, 2=rook, 3=queen)
+            capturesonly : only generate captures and promotions
+            moves : list to which the moves are appended (None for a new list)
+        Return:
+            moves : list of (from, to, promotion)-tuples
+        """
+        if color is None:
+            color = self.color
+        if moves is None:
+            moves = []
+        o = 6*color
+        bb = self.bb
+        own = self.occ[color]
+        enemy = self.occ[1-color]
+        occ = own | enemy
+        empty = ~occ & FULL
+        # pawns
+        pawns = bb[o+1] & frommask
+        if pawns:
+            up = color == self.up
+            step = -8 if up else 8
+            last = 0xFF if up else 0xFF << 56
+            single = (pawns >> 8 if up else pawns << 8) & empty
+            if capturesonly:
+                single &= last
+                double = 0
+            else:
+                double = (single >> 8 if up else single << 8) & empty & (0xFF << 32 if up else 0xFF << 24)
+            targets = enemy
+            if self.ep is not None:
+                # square behind the pawn which made a double step
+                targets |= 1 << (self.ep+step)
+            # bits are iterated inline (instead of by iterBits), as this is the hottest loop of the search
+            while single:
+                low = single & -single
+                to = low.bit_length()-1
+                single ^= low
+                self._addPawnMoves(moves, to-step, to, last, promotions)
+            while double:
+                low = double & -double
+                to = low.bit_length()-1
+                double ^= low
+                moves.append(MOVES[to-2*step][to])
+            attacks = PAWN_ATTACKS[up]
+            while pawns:
+                low = pawns & -pawns
+                frm = low.bit_length()-1
+                pawns ^= low
+                b = attacks[frm] & targets
+                while b:
+                    low = b & -b
+                    to = low.bit_length()-1
+                    b ^= low
+                    self._addPawnMoves(moves, frm, to, last, promotions)
+        # pieces
+        targets = (enemy if capturesonly else ~own)
+        for p in range(o+2, o+7):
+            b = bb[p] & frommask
+            while b:
+                low = b & -b
+                frm = low.bit_length()-1
+                b ^= low
+                tos = MOVES[frm]
+                a = self.attacksFrom(frm, p) & targets
+                while a:
+                    low = a & -a
+                    a ^= low
+                    moves.append(tos[low.bit_length()-1])
+        # castling
+        k = bb[o+6] & frommask
+        if k and not capturesonly:
+            self._addCastlingMoves(moves, color, lsb(k), occ)
+        return moves
+
+    def _addPawnMoves(self, moves, frm, to, last, promotions):
+        if (1 << to) & last:
+            options = PROMOTION_MOVES[frm*64+to]
+            for po in promotions:
+                moves.append(options[po])
+        else:
+            moves.append(MOVES[frm][to])
+
+    def _addCastlingMoves(self, moves, color, ksq, occ):
+        row = 7 if color == self.up else 0
+        if ksq >> 3 != row:
+            return
+        ci = 3 if row == 7 else 0
+        castle = self.castle
+        if castle[ci+1]:
+            return
+        rook = 2+6*color
+        col = ksq & 7
+        # W
+        if not castle[ci] and self.board[row*8] == rook:
+            between = sum(1 << (row*8+j) for j in range(1, col))
+            if not occ & between and not self.isAttacked([ksq, ksq-1, ksq-2], 1-color):
+                moves.append(MOVES[ksq][ksq-2])
+        # E
+        if not castle[ci+2] and self.board[row*8+7] == rook:
+            between = sum(1 << (row*8+j) for j in range(col+1, 7))
+            if not occ & between and not self.isAttacked([ksq, ksq+1, ksq+2], 1-color):
+                moves.append(MOVES[ksq][ksq+2])
+
+    def pins(self, color, ksq):
+        """
+        Arguments:
+            color : color index of the king
+            ksq : square of the king
+        Return:
+            pinned : dict mapping squares of pinned components to the mask of squares they may move to
+        """
+        pinned = {}
+        bb = self.bb
+        o = 6*(1-color)
+        occ = self.occ[0] | self.occ[1]
+        own = self.occ[color]
+        for d, sliders in ((N, bb[o+2] | bb[o+5]), (S, bb[o+2] | bb[o+5]), (E, bb[o+2] | bb[o+5]), (W, bb[o+2] | bb[o+5]),
+                           (NE, bb[o+4] | bb[o+5]), (NW, bb[o+4] | bb[o+5]), (SE, bb[o+4] | bb[o+5]), (SW, bb[o+4] | bb[o+5])):
+            ray = RAYS[d][ksq]
+            if not ray & sliders:
+                continue
+            blockers = ray & occ
+            # first and second component along the ray, seen from the king
+            first = (lsb(blockers) if d in (S, E, SE, SW) else blockers.bit_length()-1)
+            if not (1 << first) & own:
+                continue
+            blockers ^= 1 << first
+            if not blockers:
+                continue
+            second = (lsb(blockers) if d in (S, E, SE, SW) else blockers.bit_length()-1)
+            if (1 << second) & sliders:
+                pinned[first] = BETWEEN[ksq][second] | (1 << second)
+        return pinned
+
+    def legalMoves(self, color=None, frommask=FULL, promotions=(3,), capturesonly=False, moves=None):
+        """
+        Generate legal moves by means of a check mask and the pinned components, which are
+        computed once for the position, instead of testing each pseudo-legal move for check.
+        Pseudo-legal moves are generated into the result and filtered in place.
+
+        Arguments:
+            color : color index of side to move (defaults to self.color)
+            frommask : bitboard restricting the origin squares
+            promotions : promotion options to generate (0=bishop, 1=knight, 2=rook, 3=queen)
+            capturesonly : only generate captures and promotions
+            moves : list to which the moves are written, eg, a buffer which is reused (None for a new list)
+        Return:
+            moves : list of legal (from, to, promotion)-tuples
+        """
+        if color is None:
+            color = self.color
+        if moves is None:
+            moves = []
+        else:
+            moves.clear()
+        kbb = self.bb[6+6*color]
+        if not kbb:
+            return self.generateMoves(color, frommask, promotions, capturesonly, moves)
+        ksq = lsb(kbb)
+        enemy = 1-color
+        own = self.occ[color]
+        occ = own | self.occ[enemy]
+        checkers = self.attackers(ksq, enemy)
+        legal = moves
+        if kbb & frommask:
+            # king moves: target squares may not be attacked once the king has left its square
+            occ_noking = occ ^ kbb
+            tos = MOVES[ksq]
+            for to in iterBits(KING_ATTACKS[ksq] & (self.occ[enemy] if capturesonly else ~own)):
+                if not self.isSquareAttacked(to, enemy, occ_noking):
+                    legal.append(tos[to])
+            if not checkers and not capturesonly:
+                self._addCastlingMoves(legal, color, ksq, occ)
+        if checkers & (checkers-1):
+            # double check: only the king can move
+            return legal
+        if checkers:
+            # capture the checking component or block its ray
+            checkmask = checkers | BETWEEN[ksq][lsb(checkers)]
+        else:
+            checkmask = FULL
+        pinned = self.pins(color, ksq)
+        board = self.board
+        # generate behind the king moves and keep the legal ones (in place)
+        n = len(legal)
+        self.generateMoves(color, frommask & ~kbb, promotions, capturesonly, legal)
+        for i in range(n, len(legal)):
+            m = legal[i]
+            frm, to = m[0], m[1]
+            if board[frm] % 6 == 1 and board[to] == 0 and (to-frm) & 7:
+                # en passant removes two components from a row (possibly discovering a check), hence, test explicitly
+                undo = self.makeMove(m)
+                ok = not self.isChecked(color)
+                self.unmakeMove(m, undo)
+            else:
+                ok = (1 << to) & checkmask and (frm not in pinned or (1 << to) & pinned[frm])
+            if ok:
+                legal[n] = m
+                n += 1
+        del legal[n:]
+        return legal
+
+    def isStalemated(self, color):
+        # no legal move for color, out of check a legal king move or any move of an unpinned piece
+        # proves otherwise without generating all legal moves
+        kbb = self.bb[6+6*color]
+        if kbb and not self.isChecked(color):
+            ksq = lsb(kbb)
+            enemy = 1-color
+            own = self.occ[color]
+            occ_noking = (own | self.occ[enemy]) ^ kbb
+            for to in iterBits(KING_ATTACKS[ksq] & ~own):
+                if not self.isSquareAttacked(to, enemy, occ_noking):
+                    return False
+            pinned = self.pins(color, ksq)
+            targets = ~own & FULL
+            for p in range(6*color+2, 6*color+6):
+                for frm in iterBits(self.bb[p]):
+                    if frm not in pinned and self.attacksFrom(frm, p) & targets:
+                        return False
+        return len(self.legalMoves(color)) == 0
+
+    def capturePoints(self, move):
+        # points gained by move (en passant captures a pawn on an empty target square)
+        captured = self.board[move[1]]
+        if captured:
+            return POINTS[(captured-1) % 6]
+        if self.board[move[0]] % 6 == 1 and (move[1]-move[0]) & 7:
+            return 1
+        return 0
+
+    def evaluate(self):
+        # material and piece-square balance (in points) from the perspective of the player to move, tapered by the game phase
+        color = self.color
+        middlegame = self.psqt[color]-self.psqt[1-color]
+        endgame = self.psqt_endgame[color]-self.psqt_endgame[1-color]
+        return taper(middlegame, endgame, min(self.phase, PHASE_TOTAL))/100
+
+    def makeMove(self, move):
+        """
+        Apply (from, to, promotion)-move in place. Follows the same rules as applyMove in chess.py.
+
+        Arguments:
+            move : (from, to, promotion)-move to apply
+        Return:
+            undo : (component, captured, captured square, ep, castle, points, key)-record for unmakeMove
+        """
+        frm, to, po = move
+        board = self.board
+        p = board[frm]
+        color = (p-1)//6
+        t = (p-1) % 6
+        undo_ep, undo_castle, undo_key = self.ep, self.castle, self.key
+        ep = None
+        captured, capsq = 0, to
+        castle = None
+        if t == 0:
+            if abs(to-frm) == 16:
+                ep = to
+            elif (to-frm) & 7 and board[to] == 0 and self.ep is not None:
+                # en passant move
+                capsq = self.ep
+                captured = self.removeComponent(capsq)
+        elif t == 1:
+            if frm in CORNERS:
+                castle = CORNERS[frm]
+        elif t == 5:
+            castle = (4 if color == self.up else 1)
+            # check if castled -> change rooks
+            if abs(to-frm) == 2:
+                row = frm & ~7
+                if to > frm:
+                    self.putComponent(self.removeComponent(row+7), to-1)
+                else:
+                    self.putComponent(self.removeComponent(row), to+1)
+        if castle is not None and not self.castle[castle]:
+            self.castle = self.castle[:]
+            self.castle[castle] = True
+            self.key ^= CASTLE_KEYS[castle]
+        if board[to]:
+            captured = self.removeComponent(to)
+            # a capture on a corner square also loses the right to castle with that rook
+            if to in CORNERS and not self.castle[CORNERS[to]]:
+                self.castle = self.castle[:]
+                self.castle[CORNERS[to]] = True
+                self.key ^= CASTLE_KEYS[CORNERS[to]]
+        points = 0
+        if captured:
+            points = POINTS[(captured-1) % 6]
+            self.score[0 if color == self.up else 1] += points
+        self.removeComponent(frm)
+        if po is not None and t == 0:
+            self.putComponent(PROMOTIONS[po]+6*color, to)
+        else:
+            self.putComponent(p, to)
+        if undo_ep is not None:
+            self.key ^= EP_KEYS[undo_ep]
+        if ep is not None:
+            self.key ^= EP_KEYS[ep]
+        self.ep = ep
+        self.color = 1-color
+        self.key ^= COLOR_KEY
+        return (p, captured, capsq, undo_ep, undo_castle, points, undo_key)
+
+    def unmakeMove(self, move, undo):
+        frm, to, _ = move
+        p, captured, capsq, ep, castle, points, key = undo
+        color = (p-1)//6
+        self.removeComponent(to)
+        self.putComponent(p, frm)
+        if (p-1) % 6 == 5 and abs(to-frm) == 2:
+            # castled -> move rook back
+            row = frm & ~7
+            if to > frm:
+                self.putComponent(self.removeComponent(to-1), row+7)
+            else:
+                self.putComponent(self.removeComponent(to+1), row)
+        if captured:
+            self.putComponent(captured, capsq)
+            self.score[0 if color == self.up else 1] -= points
+        self.ep = ep
+        self.castle = castle
+        self.color = color
+        self.key = key
+
+    def makeNullMove(self):
+        # pass the turn to the opponent (for null-move pruning), returns the (ep, key)-record for unmakeNullMove
+        undo = (self.ep, self.key)
+        if self.ep is not None:
+            self.key ^= EP_KEYS[self.ep]
+            self.ep = None
+        self.color = 1-self.color
+        self.key ^= COLOR_KEY
+        return undo
+
+    def unmakeNullMove(self, undo):
+        self.ep, self.key = undo
+        self.color = 1-self.color
+
+    def hasPieces(self, color):
+        # whether color has components other than pawns and king
+        counts = self.counts
+        o = 6*color
+        return counts[o+2]+counts[o+3]+counts[o+4]+counts[o+5] > 0
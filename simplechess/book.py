@@ -0,0 +1,204 @@
+"""
+File containing code for opening books.
+Author: Thomas Mortier
+Date: October 2026
+
+A book is a file of 16-byte entries (big-endian key, move, weight and learn
+field, as in the Polyglot format), sorted by key. Keys are the Zobrist keys of
+the bitboard backend for orientation white and moves are packed by packMove,
+hence, books are independent of the orientation of the game. The file is
+memory mapped and queried by binary search, such that opening a book does not
+depend on its size.
+
+Usage:
+    python -m simplechess.book build games.pgn -o book.bin --plies 20
+    python -m simplechess.book probe book.bin --moves "e2e4 e7e5"
+"""
+import sys
+import os
+import mmap
+import struct
+import random
+import argparse
+
+from simplechess.bitboard import Position, WHITE, packMove, unpackMove
+from simplechess.zobrist import COMPONENT_KEYS, CASTLE_KEYS, EP_KEYS, COLOR_KEY
+from simplechess.pgn import readGames, parseSan, startPosition
+from simplechess.fen import STARTPOS, parseFen, fromUci, toUci
+
+ENTRY = struct.Struct(">QHHI")
+ENTRY_SIZE = ENTRY.size
+KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+
+def bookKey(position):
+    # Zobrist key of position as seen with orientation white (the board of orientation black is rotated)
+    if position.orientation == "white":
+        return position.key
+    key = (COLOR_KEY if position.color == WHITE else 0)
+    for sq, p in enumerate(position.board):
+        if p:
+            key ^= COMPONENT_KEYS[p][63-sq]
+    for i, moved in enumerate(position.castle):
+        if moved:
+            key ^= CASTLE_KEYS[5-i]
+    if position.ep is not None:
+        key ^= EP_KEYS[63-position.ep]
+    return key
+
+def _rotate(move, orientation):
+    # move on the board of orientation white to the board of the given orientation (and back)
+    if orientation == "white":
+        return move
+    return (63-move[0], 63-move[1], move[2])
+
+class OpeningBook:
+    def __init__(self, path):
+        """
+        Arguments:
+            path : path of book file
+        """
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size % ENTRY_SIZE != 0:
+            self.file.close()
+            raise ValueError("Invalid book {0}!".format(path))
+        self.n = size//ENTRY_SIZE
+        # an empty file cannot be memory mapped
+        self.data = (mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.n > 0 else b"")
+
+    def __len__(self):
+        return self.n
+
+    def entries(self, key):
+        """
+        Arguments:
+            key : book key of position
+        Return:
+            entries : list of (packed move, weight)-tuples for key
+        """
+        # binary search for the first entry with key
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo+hi)//2
+            if KEY.unpack_from(self.data, mid*ENTRY_SIZE)[0] < key:
+                lo = mid+1
+            else:
+                hi = mid
+        entries = []
+        while lo < self.n:
+            k, move, weight, _ = ENTRY.unpack_from(self.data, lo*ENTRY_SIZE)
+            if k != key:
+                break
+            entries.append((move, weight))
+            lo += 1
+        return entries
+
+    def probe(self, position):
+        """
+        Arguments:
+            position : bitboard position of game
+        Return:
+            moves : list of legal (from, to, promotion)-moves in position together with their weights
+        """
+        entries = self.entries(bookKey(position))
+        if len(entries) == 0:
+            return []
+        legal = position.legalMoves(promotions=(0, 1, 2, 3))
+        moves = []
+        for code, weight in entries:
+            move = _rotate(unpackMove(code), position.orientation)
+            if move in legal and weight > 0:
+                moves.append((move, weight))
+        return moves
+
+    def choose(self, position, rng=random):
+        """
+        Arguments:
+            position : bitboard position of game
+            rng : random number generator
+        Return:
+            move : book move, chosen at random proportionally to its weight (None if the position is not in the book)
+        """
+        moves = self.probe(position)
+        if len(moves) == 0:
+            return None
+        return rng.choices([m for m, _ in moves], weights=[w for _, w in moves])[0]
+
+    def close(self):
+        if self.n > 0:
+            self.data.close()
+        self.file.close()
+
+def buildBook(streams, plies=20, log=None):
+    """
+    Count the moves played in the first plies of the games, weighted by their outcome for the
+    player who made the move (win 2, draw or unknown 1, loss 0).
+
+    Arguments:
+        streams : text streams with games in PGN
+        plies : number of plies per game to add to the book
+        log : stream for warnings on invalid games (None to ignore)
+    Return:
+        weights : dict mapping (key, packed move)-pairs to weights
+    """
+    weights = {}
+    for stream in streams:
+        for tags, moves, result in readGames(stream):
+            try:
+                position = startPosition(tags)
+                for san in moves[:plies]:
+                    move = parseSan(position, san)
+                    if result is None or result == 0.5:
+                        w = 1
+                    else:
+                        w = (2 if (result == 1) == (position.color == WHITE) else 0)
+                    k = (bookKey(position), packMove(move))
+                    weights[k] = weights.get(k, 0)+w
+                    position.makeMove(move)
+            except ValueError as e:
+                if log is not None:
+                    log.write("skipped game {0}: {1}\n".format(tags.get("Event", "?"), e))
+    return weights
+
+def writeBook(weights, path):
+    # entries without weight are left out, weights are scaled down to 16 bits if needed
+    top = max(weights.values(), default=0)
+    scale = (MAX_WEIGHT/top if top > MAX_WEIGHT else 1)
+    entries = sorted(((k, m, max(1, int(w*scale))) for (k, m), w in weights.items() if w > 0), key=lambda e: (e[0], -e[2]))
+    with open(path, "wb") as f:
+        for k, m, w in entries:
+            f.write(ENTRY.pack(k, m, w, 0))
+    return len(entries)
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Simple Chess opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("-o", "--output", dest="output", required=True)
+    build.add_argument("--plies", dest="plies", type=int, default=20)
+    probe = commands.add_parser("probe")
+    probe.add_argument("book")
+    probe.add_argument("--fen", dest="fen", default=STARTPOS)
+    probe.add_argument("--moves", dest="moves", default="")
+    args = parser.parse_args()
+    if args.command == "build":
+        streams = [open(path) for path in args.pgn]
+        try:
+            n = writeBook(buildBook(streams, args.plies, sys.stderr), args.output)
+        finally:
+            for stream in streams:
+                stream.close()
+        print("{0} entries written to {1}".format(n, args.output))
+    else:
+        book = OpeningBook(args.book)
+        state, ep, castle, color = parseFen(args.fen)
+        position = Position.fromState(state, "white", ep, castle, color)
+        for name in args.moves.split():
+            position.makeMove(fromUci(name, "white"))
+        moves = book.probe(position)
+        total = sum(w for _, w in moves)
+        for move, weight in sorted(moves, key=lambda e: -e[1]):
+            print("{0}: {1} ({2:.1f}%)".format(toUci(move, "white"), weight, 100*weight/total))
+        book.close()
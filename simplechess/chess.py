@@ -15,11 +15,15 @@ import argparse
 import random
 import time
 import threading
+import queue
 
 import numpy as np
 
-from simplechess.logic import isValidComponentPosition, isChecked, isStalemated
-from simplechess.engine import RandomEngine, ABPEngine
+from simplechess.logic import isValidComponentPosition, getStatus, applyMove as applyStateMove
+from simplechess.engine import RandomEngine, ABPEngine, getTimeBudget
+from simplechess.fen import STARTPOS, parseFen, toUci
+from simplechess.bitboard import toSquare
+from simplechess.stats import JsonLinesSink
 from threading import Timer
 
 S_OFFSET = {
@@ -86,6 +90,62 @@ class Clock:
         else:
             return 0
 
+class EngineWorker(threading.Thread):
+    """
+    Runs the engine in a background thread, such that the game loop keeps handling events and
+    drawing the board while the engine is thinking. Moves are returned through a queue. With
+    pondering, the engine searches on the expected reply of the player during the turn of the
+    player, which continues as regular search in case of a ponder hit.
+    """
+    def __init__(self, engine, ponder=False):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.ponder = ponder and isinstance(engine, ABPEngine)
+        self.pondering = False
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+
+    def run(self):
+        while True:
+            job = self.requests.get()
+            if job is None:
+                break
+            self.results.put(job())
+
+    def requestMove(self, state, score, ep, castle, timeout):
+        if self.pondering:
+            self.pondering = False
+            if self.engine.isPonderHit(state, score, ep, castle):
+                # the move is returned by the pondering search
+                self.engine.ponderHit(timeout)
+                return
+            # discard the result of the pondering search
+            self.engine.stop()
+            self.results.get()
+            self.engine.prepare()
+        state, score, castle = np.copy(state), list(score), list(castle)
+        ep = (list(ep) if ep is not None else None)
+        self.requests.put(lambda: self.engine.getMove(state, score, ep, castle, timeout))
+
+    def startPondering(self, state, score, ep, castle):
+        if not self.ponder:
+            return
+        position = self.engine.getPonderPosition(state, score, ep, castle)
+        if position is not None:
+            self.pondering = True
+            self.requests.put(lambda: self.engine.ponder(position))
+
+    def stop(self):
+        # interrupt the search (if any) and let the thread finish before the engine closes its book,
+        # tablebases and worker processes, which the search may still be using
+        if isinstance(self.engine, ABPEngine):
+            self.engine.stop()
+        self.requests.put(None)
+        if self.is_alive():
+            self.join()
+        if isinstance(self.engine, ABPEngine):
+            self.engine.close()
+
 def logConsole(s):
     sys.stdout.write(s)
     sys.stdout.write('\n')
@@ -114,6 +174,73 @@ def updateBoard(state, coord, screen):
                 if state[i,j] > 0:
                     screen.blit(P_SPRITE[IND_2_P[state[i,j]-1]], (start_pos_x+(j*offset), start_pos_y+(i*offset)))
 
+class Renderer:
+    """
+    Retained-mode renderer of the board and clocks. The background is drawn once into a cached
+    layer, from which squares and texts are restored. Each frame, only the squares whose
+    component changed and the clock texts whose displayed second (or score) changed are redrawn,
+    and only these areas are updated on the display.
+    """
+    def __init__(self, screen, chessbg, size, fps):
+        self.screen = screen
+        self.coord = S_OFFSET[size]
+        self.psize = S_PSIZE[size]
+        self.fps = fps
+        self.gameclock = pygame.time.Clock()
+        # persistent font for game info
+        self.font = pygame.font.Font(pygame.font.get_default_font(), S_TEXTSIZE[size][0])
+        xoff = S_SIZE[size][0]//12
+        self.layer = pygame.Surface(screen.get_size())
+        self.layer.fill(pygame.Color("black"))
+        self.layer.blit(chessbg, (0,xoff))
+        # positions of the info of the opponent and the player
+        self.text_pos = [(S_TEXTSIZE[size][1], S_TEXTSIZE[size][2]), (S_TEXTSIZE[size][1], S_SIZE[size][0]+xoff+S_TEXTSIZE[size][2])]
+        # what is currently on the display
+        self.state = None
+        self.texts = [None, None]
+        self.text_rects = [None, None]
+
+    def invalidate(self):
+        # redraw everything in the next frame (eg, after the window has been exposed)
+        self.state = None
+        self.texts = [None, None]
+
+    def squareRect(self, i, j):
+        start_pos_x, start_pos_y, offset = self.coord
+        return pygame.Rect(int(start_pos_x+(j*offset)), int(start_pos_y+(i*offset)), self.psize[0], self.psize[1])
+
+    def draw(self, state, clocks, score):
+        dirty = []
+        if self.state is None:
+            self.screen.blit(self.layer, (0,0))
+            updateBoard(state, self.coord, self.screen)
+            dirty.append(self.screen.get_rect())
+        else:
+            for i, j in np.argwhere(state != self.state):
+                rect = self.squareRect(i, j)
+                self.screen.blit(self.layer, rect, rect)
+                if state[i,j] > 0:
+                    self.screen.blit(P_SPRITE[IND_2_P[state[i,j]-1]], rect)
+                dirty.append(rect)
+        self.state = np.copy(state)
+        # info of opponent and player, rendered only when the displayed second or score changes
+        for k, (clock, points) in enumerate(((clocks[1], score[1]), (clocks[0], score[0]))):
+            text = str(time.strftime('%H:%M:%S', time.gmtime(clock.get_remaining_time())))+"   ({0})".format(points)
+            if text == self.texts[k]:
+                continue
+            surface = self.font.render(text, False, (255, 255, 255))
+            rect = surface.get_rect(topleft=self.text_pos[k])
+            # the previous text may have been wider
+            area = (rect.union(self.text_rects[k]) if self.text_rects[k] is not None else rect)
+            self.screen.blit(self.layer, area, area)
+            self.screen.blit(surface, rect)
+            self.texts[k], self.text_rects[k] = text, rect
+            dirty.append(area)
+        if len(dirty) > 0:
+            pygame.display.update(dirty)
+        # wait fps seconds
+        self.gameclock.tick(self.fps)
+
 def isValidMousePosition(mousepos, coord):
     if not coord[0]<=mousepos[0]<=(coord[1]+(8*coord[2])):
         return False
@@ -132,18 +259,6 @@ def applyMove(coord, new_coord, state, score, orientation, ep, castle, opponent,
     else:
         valid_move = isValidComponentPosition(coord, new_coord, state, orientation, ep, castle)
     if valid_move:
-        # checks for double pawn or en passant 
-        if new_coord[1]==coord[1] and abs(new_coord[0]-coord[0])==2 and state[coord] in [1,7]:
-            ep = list(new_coord)
-        elif state[coord] in [1,7] and state[new_coord]==0 and new_coord[0]!=coord[0] and new_coord[1]!=coord[1] and ep!=None:
-            # en passant move
-            if new_coord[0] > coord[0]:
-                state[new_coord[0]-1,new_coord[1]] = 0
-            else:
-                state[new_coord[0]+1,new_coord[1]] = 0
-            ep = None
-        else:
-            ep = None
         # check for pawn promotion
         if coord[0]!=new_coord[0] and state[coord] in [1,7] and (new_coord[0]==0 or new_coord[0]==7):
             if opponent:
@@ -159,39 +274,16 @@ def applyMove(coord, new_coord, state, score, orientation, ep, castle, opponent,
                             break
                     except Exception as e:
                         logConsole("Invalid option!")
-        # check whether we have a rook or king move
-        if state[coord] in [2,8]:
-            if coord==(0,0):
-                castle[0]=True
-            elif coord==(0,7):
-                castle[2]=True
-            elif coord==(7,0):
-                castle[3]=True
-            elif coord==(7,7):
-                castle[5]=True
-        if state[coord] in [6,12]:
-            if (coord==(0,4) and state[coord]==6) or (coord==(0,3) and state[coord]==12):
-                castle[1]=True
-            elif (coord==(7,3) and state[coord]==6) or (coord==(7,4) and state[coord]==12):
-                castle[4]=True
-            # check if castled -> change rooks
-            if abs(coord[1]-new_coord[1])==2:
-                # check if W or E
-                if coord[1]<new_coord[1]:
-                    state[new_coord[0],new_coord[1]-1] = state[coord[0],7]
-                    state[coord[0],7] = 0
-                else:
-                    state[new_coord[0],new_coord[1]+1] = state[coord[0],0]
-                    state[coord[0],0] = 0
+        ep, captured = applyStateMove(coord, new_coord, state, ep, castle, poption)
         # check if piece is captured
-        if state[new_coord] != 0:
+        if captured != 0:
             # get points
             points = 0
-            if state[new_coord] in [1,7]:
+            if captured in [1,7]:
                 points = 1
-            elif state[new_coord] in [2,8]:
+            elif captured in [2,8]:
                 points = 5
-            elif state[new_coord] in [5,11]:
+            elif captured in [5,11]:
                 points = 9
             else:
                 points = 3
@@ -199,57 +291,53 @@ def applyMove(coord, new_coord, state, score, orientation, ep, castle, opponent,
                 score[1] += points
             else:
                 score[0] += points
-        if poption is not None:
-            if poption==0:
-                state[new_coord] = 4+((state[coord]//7)*6)
-            elif poption==1:
-                state[new_coord] = 3+((state[coord]//7)*6)   
-            elif poption==2:
-                state[new_coord] = 2+((state[coord]//7)*6)   
-            else:
-                state[new_coord] = 5+((state[coord]//7)*6)   
-        else:
-            state[new_coord] = state[coord]
-        state[coord] = 0 
         coord = None
         moved = True
     return ep, coord, moved
 
-def drawBoard(args, state, screen, chessbg, offs, gameclock, clocks, score):
-    screen.fill(pygame.Color("black"))
-    # set background
-    xoff = S_SIZE[args.size][0]//12
-    screen.blit(chessbg, (0,xoff))
-    updateBoard(state, S_OFFSET[args.size], screen)
-    # create font instance for game info
-    font = pygame.font.Font(pygame.font.get_default_font(), S_TEXTSIZE[args.size][0])
-    # print info opponent
-    info_opponent = str(time.strftime('%H:%M:%S', time.gmtime(clocks[1].get_remaining_time())))+"   ({0})".format(score[1])
-    text_surface = font.render(info_opponent, False, (255, 255, 255))
-    screen.blit(text_surface, dest=(S_TEXTSIZE[args.size][1], S_TEXTSIZE[args.size][2]))
-    # print info player
-    info_player = str(time.strftime('%H:%M:%S', time.gmtime(clocks[0].get_remaining_time())))+"   ({0})".format(score[0])
-    text_surface = font.render(info_player, False, (255, 255, 255))
-    screen.blit(text_surface, dest=(S_TEXTSIZE[args.size][1],S_SIZE[args.size][0]+xoff+S_TEXTSIZE[args.size][2]))
-    # update screen
-    pygame.display.update()
-    # wait fps seconds
-    gameclock.tick(args.fps)
+def waitEngine(worker, renderer, state, clocks, score, exceeded):
+    # handle events and draw the board until the engine has returned its move
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                clocks[0].cancel()
+                clocks[1].cancel()
+                worker.stop()
+                sys.exit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                renderer.invalidate()
+        if exceeded.is_set() and isinstance(worker.engine, ABPEngine):
+            worker.engine.stop()
+        try:
+            return worker.results.get_nowait()
+        except queue.Empty:
+            renderer.draw(state, clocks, score)
+
+def reportStats(args, engine, sink, comp, pos, orientation):
+    # statistics of the search for the last move of the engine
+    if comp is None or not isinstance(engine, ABPEngine) or not (args.stats or sink is not None):
+        return
+    stats = engine.getStats()
+    move = toUci((toSquare(comp), toSquare(pos), None), orientation)
+    # expected continuation, starting with the move played
+    pv = " ".join(toUci(m, orientation) for m in engine.getPV())
+    if args.stats:
+        logConsole("Engine played {0} (pv {1})\n{2}".format(move, pv, stats.format()))
+    if sink is not None:
+        sink.write(stats, move=move, pv=pv)
 
 def checkGameEvent(color, state, orientation, ep, castle, clocks):
-    # is checked?
-    checked = isChecked(color, state, orientation, ep, castle)
-    # is stalemated?
-    stalemated = isStalemated(color, state, orientation, ep, castle)
-    if checked and not stalemated:
+    # status is cached per position, hence, this is cheap when called every frame
+    status = getStatus(color, state, orientation, ep, castle)
+    if status.checked and not status.checkmate:
         logConsole('King {0} is checked!'.format(color))
-    elif not checked and stalemated:
+    elif status.stalemate:
         clocks[0].cancel()
         clocks[1].cancel()
         logConsole('King {0} is stalemated! Draw!'.format(color))
         input("Press any key to exit game...")
         sys.exit()
-    elif checked and stalemated:
+    elif status.checkmate:
         clocks[0].cancel()
         clocks[1].cancel()
         logConsole('Checkmate! Player {0} has won!'.format(("white" if color=="black" else "black")))
@@ -266,73 +354,80 @@ def main(args):
     screen = pygame.display.set_mode((size_screen))
     pygame.display.set_caption("Simple Chess")
     # init background and state
-    state = np.zeros((8,8),dtype=np.int)
     orientation = args.colour
     if orientation == "random":
         m = random.choice(["w","b"])
         orientation = "white" if m=="w" else "black"
     if orientation == "black":
         chessbg = pygame.image.load("simplechess/assets/backgroundb.png")
-        # init pawns
-        state[6,:] = np.ones(8)
-        state[1,:] = np.ones(8)*7
-        # init border ranks
-        state[7,:] = np.array([2,3,4,6,5,4,3,2])
-        state[0,:] = np.array([8,9,10,12,11,10,9,8])
     else:
         chessbg = pygame.image.load("simplechess/assets/backgroundw.png")
-        # init pawns
-        state[6,:] = np.ones(8)*7
-        state[1,:] = np.ones(8)
-        # init border ranks
-        state[7,:] = np.array([8,9,10,11,12,10,9,8])
-        state[0,:] = np.array([2,3,4,5,6,4,3,2])
+    try:
+        state, ep, castle, color = parseFen(args.fen, orientation)
+    except (ValueError, IndexError, KeyError):
+        logConsole("Invalid FEN {0}!".format(args.fen))
+        sys.exit(1)
+    # does the engine move first?
+    engine_first = color != orientation
     chessbg = pygame.transform.scale(chessbg, S_SIZE[args.size])
     # init sprites
     initSprites(args)
-    # init clock for fps
-    gameclock = pygame.time.Clock()
+    # init renderer (which holds the clock for fps)
+    renderer = Renderer(screen, chessbg, args.size, args.fps)
     # init state vars
     score = [0, 0]
     moved = False
     coord = (-1,-1)
-    ep = None
-    castle = [False]*6
     # init game engine
     if args.level == 0:
-        engine = RandomEngine(("white" if orientation=="black" else "black"), orientation)
+        engine = RandomEngine(("white" if orientation=="black" else "black"), orientation, seed=args.seed)
     else:
-        engine = ABPEngine(("white" if orientation=="black" else "black"), orientation, args.level)
+        try:
+            engine = ABPEngine(("white" if orientation=="black" else "black"), orientation, args.level, args.hash, quiescence=not args.no_quiescence, threads=args.threads, seed=args.seed, book=args.book, tablebases=args.tablebases)
+        except (OSError, ValueError) as e:
+            logConsole(str(e))
+            sys.exit(1)
+    sink = None
+    if isinstance(engine, ABPEngine) and (args.stats or args.stats_file is not None):
+        engine.enableStats()
+        if args.stats_file is not None:
+            sink = JsonLinesSink(args.stats_file)
+    worker = EngineWorker(engine, args.ponder)
+    worker.start()
     # init chess clocks
     clock_player_exceeded = threading.Event()
     clock_opponent_exceeded = threading.Event()
     clock_player = Clock(args.timeout*60, clock_player_exceeded, lambda x: x.set())
     clock_opponent = Clock(args.timeout*60, clock_opponent_exceeded, lambda x: x.set())
     # start the clocks
-    if orientation=="black":
+    if engine_first:
         clock_opponent.start()
     else:
         clock_player.start()
     # draw initial board
-    drawBoard(args, state, screen, chessbg, S_OFFSET[args.size], gameclock, [clock_player, clock_opponent], score)
+    renderer.draw(state, [clock_player, clock_opponent], score)
     # game loop
     while True:   
-        if orientation == "black":
-            if coord != (-1,-1):
-                time.sleep(1)
-            comp, pos = engine.getMove(state, score, ep, castle)
+        if engine_first:
+            worker.requestMove(state, score, ep, castle, getTimeBudget(clock_opponent.get_remaining_time()))
+            comp, pos = waitEngine(worker, renderer, state, [clock_player, clock_opponent], score, clock_opponent_exceeded)
+            reportStats(args, engine, sink, comp, pos, orientation)
             ep, coord, _ = applyMove(comp, pos, state, score, orientation, ep, castle, True, engine)
-            drawBoard(args, state, screen, chessbg, S_OFFSET[args.size], gameclock, [clock_player, clock_opponent], score)
+            renderer.draw(state, [clock_player, clock_opponent], score)
             # check for game event
-            checkGameEvent("black", state, orientation, ep, castle, [clock_player, clock_opponent])
+            checkGameEvent(orientation, state, orientation, ep, castle, [clock_player, clock_opponent])
             clock_opponent.pause()
             clock_player.resume()
+            worker.startPondering(state, score, ep, castle)
         while not moved and not clock_opponent_exceeded.is_set() and not clock_player_exceeded.is_set():
             for event in pygame.event.get():
                 if event.type == pygame.QUIT: 
                     clock_player.cancel()
                     clock_opponent.cancel()
+                    worker.stop()
                     sys.exit();
+                elif event.type == pygame.VIDEOEXPOSE:
+                    renderer.invalidate()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     # check if L mouse button was used
                     if event.button == 1:
@@ -350,7 +445,7 @@ def main(args):
                         # move component in case of new position which is valid
                         if coord != new_coord and isValidMousePosition(mouseposxy, S_OFFSET[args.size]):
                             ep, coord, moved = applyMove(coord, new_coord, state, score, orientation, ep, castle, False, engine)
-            drawBoard(args, state, screen, chessbg, S_OFFSET[args.size], gameclock, [clock_player, clock_opponent], score)
+            renderer.draw(state, [clock_player, clock_opponent], score)
             # check for game event
             checkGameEvent(("white" if orientation=="black" else "black"), state, orientation, ep, castle, [clock_player, clock_opponent])
         # check if loop was terminated due to exceeded clocks
@@ -371,15 +466,17 @@ def main(args):
             clock_player.pause()
             clock_opponent.resume()
             moved = False
-            if orientation == "white":
-                time.sleep(1)
-                comp, pos = engine.getMove(state, score, ep, castle)
+            if not engine_first:
+                worker.requestMove(state, score, ep, castle, getTimeBudget(clock_opponent.get_remaining_time()))
+                comp, pos = waitEngine(worker, renderer, state, [clock_player, clock_opponent], score, clock_opponent_exceeded)
+                reportStats(args, engine, sink, comp, pos, orientation)
                 ep, coord, _ = applyMove(comp, pos, state, score, orientation, ep, castle, True, engine)
-                drawBoard(args, state, screen, chessbg, S_OFFSET[args.size], gameclock, [clock_player, clock_opponent], score)
+                renderer.draw(state, [clock_player, clock_opponent], score)
                 # check for game event
-                checkGameEvent("white", state, orientation, ep, castle, [clock_player, clock_opponent])
+                checkGameEvent(orientation, state, orientation, ep, castle, [clock_player, clock_opponent])
                 clock_opponent.pause()
                 clock_player.resume()
+                worker.startPondering(state, score, ep, castle)
     # end game
     pygame.quit()
 
@@ -392,5 +489,15 @@ if __name__=='__main__':
     parser.add_argument("-s", "--size", dest='size', default="medium", choices=screensize)
     parser.add_argument("-c", "--colour", dest="colour", default="random", choices=colour)
     parser.add_argument("-f", "--fps", dest="fps", type=int, default=60)
+    parser.add_argument("--hash", dest="hash", type=int, default=16)
+    parser.add_argument("--threads", dest="threads", type=int, default=1)
+    parser.add_argument("--seed", dest="seed", type=int, default=None)
+    parser.add_argument("--ponder", dest="ponder", action="store_true")
+    parser.add_argument("--fen", dest="fen", default=STARTPOS)
+    parser.add_argument("--book", dest="book", default=None)
+    parser.add_argument("--tablebases", dest="tablebases", default=None)
+    parser.add_argument("--no-quiescence", dest="no_quiescence", action="store_true")
+    parser.add_argument("--stats", dest="stats", action="store_true")
+    parser.add_argument("--stats-file", dest="stats_file", default=None)
     args = parser.parse_args()
     main(args)
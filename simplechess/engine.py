@@ -5,251 +5,884 @@ Date: March 2021
 """
 import random
 import math
+import time
+import multiprocessing
+import threading
+import queue
 
-import numpy as np
+from simplechess.bitboard import Position, toCoord, packMove, unpackMove
+from simplechess.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from simplechess.evaluation import evaluateBatch, evaluatePosition, PHASE_TOTAL
+from simplechess.book import OpeningBook
+from simplechess.tablebase import Tablebases
+from simplechess.logic import getStatus
+from simplechess.stats import Profiler, SearchStats
 
-from simplechess.logic import getComponents, getValidPositions, isCheck, isChecked, isStalemated
+# score of a checkmate, reduced by the distance to the root such that shorter mates are preferred
+MATE = 1000
+MAX_PLY = 128
+
+def valueToTT(value, ply):
+    # mate scores are stored relative to the node instead of the root
+    if value >= MATE-MAX_PLY:
+        return value+ply
+    elif value <= -(MATE-MAX_PLY):
+        return value-ply
+    return value
+
+def valueFromTT(value, ply):
+    if value >= MATE-MAX_PLY:
+        return value-ply
+    elif value <= -(MATE-MAX_PLY):
+        return value+ply
+    return value
+
+# number of nodes in between two checks of the deadline and stop signal
+CHECK_NODES = 512
+# interval (in sec.) at which the root-parallel search polls its workers
+POLL_INTERVAL = 0.01
+
+# move ordering: hash move, captures (MVV-LVA), killer moves and quiet moves (history heuristic)
+HASH_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 32
+KILLER_SCORE = 1 << 24
+HISTORY_MAX = 1 << 20
+# values of attackers (index: component type) for MVV-LVA
+ATTACKER_VALUES = [1, 5, 3, 3, 9, 100]
+# upper bound on the number of legal moves in a position (for the beta cutoffs per move index)
+MAX_MOVES = 256
+
+# safety margin (in points) for delta pruning in quiescence search
+DELTA_MARGIN = 2
+
+# null-move pruning: depth reduction of the null move search (one more for deep searches)
+NULL_MIN_DEPTH = 3
+NULL_REDUCTION = 2
+# late move reductions: quiet moves from index LMR_MOVES on are searched one ply less (two from LMR_DEEP_MOVES on)
+LMR_MIN_DEPTH = 3
+LMR_MOVES = 3
+LMR_DEEP_MOVES = 6
+# futility pruning: margins (in points) per remaining depth, quiet moves are pruned if the static
+# evaluation plus the margin does not reach alpha
+FUTILITY_MARGINS = [0, 2, 5]
+# width of a null window: the resolution (in points) of the tapered evaluation of quiescence search, the full
+# evaluation has no fixed resolution (king safety is scaled continuously), values closer than this are taken as equal.
+# Windows up to twice this width are null windows (allowing for rounding), wider ones are PV nodes
+NULL_WINDOW = 1/(100*PHASE_TOTAL)
+# aspiration windows: half width (in points) of the initial window around the value of the previous
+# iteration, which is doubled on each fail low or high until it exceeds the maximum (then, the window is opened)
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 0.5
+ASPIRATION_MAX = 4
+
+class SearchTimeout(Exception):
+    pass
+
+def getTimeBudget(remaining, increment=0, movestogo=30):
+    """
+    Arguments:
+        remaining : remaining time (in sec.) on the clock of the engine
+        increment : increment (in sec.) per move
+        movestogo : expected number of moves until the next time control
+    Return:
+        budget : time (in sec.) to spend on the next move
+    """
+    budget = remaining/max(movestogo, 1)+increment*0.8
+    # never use more than half of the remaining time
+    return max(0.0, min(budget, remaining*0.5))
 
 class RandomEngine:
-    def __init__(self, color, orientation):
+    def __init__(self, color, orientation, seed=None):
         self.color = color
         self.orientation = orientation
+        self.rng = random.Random(seed)
 
-    def getMove(self, state, score, ep, castle):
-        comp, pos = None, None
-        # get components and shuffle
-        comps = getComponents(self.color, state)
-        random.shuffle(comps)
-        # run over components
-        for c in comps:
-            # get valid positions and shuffle
-            c_pos = getValidPositions(c, state, self.orientation, ep, castle)
-            random.shuffle(c_pos)
-            # do we have options?
-            if len(c_pos) > 0:
-                for p in c_pos:
-                    if not isCheck(c, p, state, self.orientation):
-                        comp, pos = c, p
-                        break
-            if comp is not None and pos is not None:
-                break
-        return comp, pos
+    def getMove(self, state, score, ep, castle, timeout=None):
+        moves = getStatus(self.color, state, self.orientation, ep, castle).moves
+        if len(moves) == 0:
+            return None, None
+        # pick a random component with legal moves, followed by one of its moves
+        comps = sorted(set(m[0] for m in moves))
+        c = self.rng.choice(comps)
+        c_moves = sorted(set(m[1] for m in moves if m[0] == c))
+        return toCoord(c), toCoord(self.rng.choice(c_moves))
 
     def getPromotion(self):
         # just pick a random option
-        return random.choice([0, 1, 2, 3])
+        return self.rng.choice([0, 1, 2, 3])
 
 class ABPEngine:
-    def __init__(self, color, orientation, depth):
+    def __init__(self, color, orientation, depth, ttsize=16, ttpolicy="depth", quiescence=True, qchecks=False, qdepth=8, threads=1, seed=None, book=None, tablebases=None, nullmove=True, lmr=True, futility=True):
+        """
+        Arguments:
+            color : color of the engine
+            orientation : orientation of the game
+            depth : depth in search tree
+            ttsize : memory budget of the transposition table in MB
+            ttpolicy : replacement policy of the transposition table ("depth" or "always")
+            quiescence : whether to resolve captures at leaf nodes by means of quiescence search (scored by
+                         material and piece-square tables), otherwise, leaf nodes are scored in batches
+                         by the full evaluation (incl. mobility and king safety), pruning decisions always
+                         use the incremental evaluation (material and piece-square tables)
+            qchecks : whether quiescence search also considers checking moves (first ply only)
+            qdepth : maximum depth of quiescence search
+            threads : number of worker processes among which the root moves are split (1 searches in-process)
+            seed : seed for the random move ordering (and choice of book moves), which makes the search deterministic
+            book : path of opening book, which is consulted before searching
+            tablebases : directory of endgame tablebases, which are probed at each node (except for the root)
+            nullmove : whether to use null-move pruning
+            lmr : whether to use late move reductions
+            futility : whether to use futility pruning
+        """
         self.color = color  # represents the color of the opponent
         self.orientation = orientation
         self.depth = depth
+        self.quiescence = quiescence
+        self.qchecks = qchecks
+        self.qdepth = qdepth
+        # selective search
+        self.nullmove = nullmove
+        self.lmr = lmr
+        self.futility = futility
+        self.threads = max(1, threads)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # transposition table is kept in between moves
+        self.tt = TranspositionTable(ttsize, ttpolicy)
+        self.book = (OpeningBook(book) if book is not None else None)
+        self.tablebases = (Tablebases(tablebases) if tablebases is not None else None)
+        # deadline and stop signal may be changed from another thread while searching (eg, pondering)
+        self.deadline = None
+        self.budget = None
+        self.interruptible = False
+        self.max_nodes = None
+        self.stop_event = threading.Event()
+        self.ponder_key = None
+        # called after each completed iteration with (depth, value, nodes, elapsed time, principal variation)
+        self.callback = None
+        self.nodes = 0
+        self.best_move = None
+        # principal variation of the last completed iteration
+        self.pv = []
+        # statistics of the last search, profiling is enabled by means of enableStats()
+        self.depth_reached = 0
+        self.elapsed = 0.0
+        self.tablebase_hits = 0
+        self.tt_baseline = self.tt.stats()
+        self.profiler = None
+        self.resetOrdering()
+        # worker processes are started right away, as forking them later on from a search thread
+        # (eg, while the main thread is blocked on stdin) may deadlock the workers
+        self.params = {"color": color, "orientation": orientation, "depth": depth, "ttsize": ttsize,
+                       "ttpolicy": ttpolicy, "quiescence": quiescence, "qchecks": qchecks, "qdepth": qdepth,
+                       "tablebases": tablebases, "nullmove": nullmove, "lmr": lmr, "futility": futility}
+        self.workers = None
+        self.results = None
+        self.shared_alpha = None
+        self.shared_stop = None
+        # identifies the search, such that workers reset their state once per search
+        self.search_id = 0
+        if self.threads > 1:
+            self.getWorkers()
+
+    def resetOrdering(self):
+        # killer moves per ply and history scores per color and (from, to)-pair
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # triangular table of principal variations, row ply holds the line from ply on
+        self.pv_table = [[] for _ in range(MAX_PLY+1)]
+        # move list per ply, which is reused by getStates for all nodes at that ply
+        self.move_buffers = [[] for _ in range(MAX_PLY+1)]
+        self.history = [[0]*4096, [0]*4096]
+        # beta cutoffs per index of the move which caused the cutoff
+        self.cutoffs = [0]*MAX_MOVES
+
+    def enableStats(self):
+        # time move generation, legality checks and evaluation and count leaves (slows down the search)
+        if self.profiler is None:
+            self.profiler = Profiler()
+            self.profiler.instrumentEngine(self)
 
-    def getMove(self, state, score, ep, castle):
-        c, ps, score = self.alphabeta(state, None, None, score, self.color, ep, castle, self.depth, math.inf*-1, math.inf, True)
-        return c, ps
+    def getStats(self):
+        """
+        Return:
+            stats : SearchStats of the last search (only the in-process part of a root-parallel search is profiled)
+        """
+        # transposition table counters are kept over the lifetime of the table
+        tt = self.tt.stats()
+        tt = {k: tt[k]-self.tt_baseline[k] for k in ("probes", "hits", "stores")}
+        return SearchStats(self.depth_reached, self.nodes, self.elapsed, self.cutoffs, tt, self.tablebase_hits, self.profiler)
 
-    def alphabeta(self, state, comp, comppos, score, color, ep, castle, depth, alpha, beta, maxp):
+    def getMove(self, state, score, ep, castle, timeout=None):
         """
         Arguments:
-            state : the (current) state of game 
-            comp : the component of current state
-            comppos : the position of current state
-            score : list of scores for both opponents for current state
-            color : the current player for which we would like to calculate possible moves and scores
+            state : the (current) state of game
+            score : list of scores for both opponents
             ep : state for en-passant
             castle : state for castling
-            depth : current depth in game tree
-            alpha : alpha score
-            beta : beta score
-            maxp : is current player the maximizing player?
+            timeout : time budget (in sec.) for the search, None searches up to self.depth
         Return:
-            best_move_comp : component of best move
-            best_move_pos : position of best move
-            score : score of best move
-        """
-        # is current node in check?
-        checked = isChecked(color, state, self.orientation, ep, castle)
-        # is current node stalemated?
-        stalemated = isStalemated(color, state, self.orientation, ep, castle)
-        if depth == 0 or (checked and stalemated):
-            # we reached a terminal node (either due to depth=0 or checkmate)
-            if (checked and stalemated):
-                return comp, comppos, 100
-            else:
-                #return comp, comppos, (score[1] if not maxp else score[0])
-                return comp, comppos, score[1]-score[0]
-        if maxp:
-            if depth==self.depth:
-                # opponent's turn
-                best_c, best_cp, best_value = None, None, math.inf*-1
-                # get all possible moves 
-                states = self.getStates(color, state, score, ep, castle)
-                # sort in decreasing order (max-player) in order to improve runtime
-                states = sorted(states, key=lambda x: x[3])[::-1]
-                for st in states: 
-                    c, cp, s = self.alphabeta(st[2], st[0], st[1], st[3], ("white" if color=="black" else "black"), st[4], st[5], depth-1, alpha, beta, False) 
-                    if s > best_value:
-                        best_value = s
-                        best_c = c
-                        best_cp = cp
-                    alpha = max(alpha, best_value)
-                    if alpha >= beta:
-                        break
-                return best_c, best_cp, best_value 
-            else:
-                # opponent's turn
-                best_value = math.inf*-1
-                # get all possible moves 
-                states = self.getStates(color, state, score, ep, castle)
-                # sort in decreasing order (max-player) in order to improve runtime
-                states = sorted(states, key=lambda x: x[3])[::-1]
-                for st in states: 
-                    c, cp, s = self.alphabeta(st[2], comp, comppos, st[3], ("white" if color=="black" else "black"), st[4], st[5], depth-1, alpha, beta, False) 
-                    if s > best_value:
-                        best_value = s
-                    alpha = max(alpha, best_value)
-                    if alpha >= beta:
+            comp : component of best move
+            pos : new position of component
+        """
+        moves = getStatus(self.color, state, self.orientation, ep, castle).moves
+        if len(moves) == 0:
+            return None, None
+        if len(set(m[:2] for m in moves)) == 1:
+            # forced move, no need to search
+            self.nodes, self.depth_reached, self.elapsed = 0, 0, 0.0
+            self.pv = [moves[0]]
+            return toCoord(moves[0][0]), toCoord(moves[0][1])
+        position = Position.fromState(state, self.orientation, ep, castle, self.color, score)
+        move = self.search(position, timeout)
+        if move is None:
+            return None, None
+        return toCoord(move[0]), toCoord(move[1])
+
+    def search(self, position, timeout=None, maxnodes=None):
+        """
+        Iterative deepening driver around alphabeta. Each iteration searches one ply deeper and
+        seeds the move ordering of the next one (through the transposition table and the best
+        root move), until self.depth is reached, the time budget is exhausted or the search is
+        stopped by means of stop(). From ASPIRATION_MIN_DEPTH on, an iteration starts with a
+        narrow window around the value of the previous one, which is widened on failure.
+        Positions in the opening book (if any) are not searched, instead, a book move is played.
+
+        Arguments:
+            position : the (current) bitboard position of game
+            timeout : time budget (in sec.) for the search, None searches up to self.depth (or
+                      until the deadline set by ponderHit)
+            maxnodes : node budget for the search (checked in between iterations only for the root-parallel search)
+        Return:
+            best_move : best (from, to, promotion)-move of the last completed iteration
+        """
+        if self.book is not None:
+            move = self.book.choose(position, self.rng)
+            if move is not None:
+                self.nodes, self.depth_reached, self.elapsed = 0, 0, 0.0
+                self.best_move = move
+                self.pv = [move]
+                self.deadline = None
+                return move
+        self.setTimeout(timeout)
+        self.max_nodes = maxnodes
+        start = time.time()
+        self.depth_reached, self.tablebase_hits = 0, 0
+        self.tt_baseline = self.tt.stats()
+        if self.profiler is not None:
+            self.profiler.reset()
+        if self.threads > 1:
+            best_move = self.searchParallel(position)
+            self.elapsed = time.time()-start
+            return best_move
+        self.tt.newSearch()
+        self.nodes = 0
+        self.best_move = None
+        self.pv = []
+        # killers and history are kept in between iterations
+        self.resetOrdering()
+        value = 0
+        for depth in range(1, self.depth+1):
+            # the first iteration always completes, such that we have a move to play
+            self.interruptible = depth > 1
+            alpha, beta, delta = math.inf*-1, math.inf, ASPIRATION_WINDOW
+            if depth >= ASPIRATION_MIN_DEPTH and abs(value) < MATE-MAX_PLY:
+                alpha, beta = value-delta, value+delta
+            try:
+                while True:
+                    # an interrupted iteration leaves its position unrestored, hence, search on a copy
+                    root = position.copy()
+                    if self.profiler is not None:
+                        self.profiler.instrumentPosition(root)
+                    move, value = self.alphabeta(root, depth, alpha, beta, 0)
+                    if move is None or alpha < value < beta:
                         break
-                return comp, comppos, best_value 
-        else:
-            # our turn
-            best_c, best_cp, best_value = None, None, math.inf
-            # get all possible moves 
-            states = self.getStates(color, state, score, ep, castle)
-            # sort in increasing order (min-player)  in order to improve runtime
-            states = sorted(states, key=lambda x: x[3])
-            for st in states: 
-                c, cp, s = self.alphabeta(st[2], comp, comppos, st[3], ("white" if color=="black" else "black"), st[4], st[5], depth-1, alpha, beta, True) 
-                if s < best_value:
-                    best_value = s
-                    best_c = c
-                    best_cp = cp
-                beta = min(beta, best_value)
-                if beta <= alpha:
-                    break
-            return best_c, best_cp, best_value 
-            
-    def getStates(self, color, state, score, ep, castle):
+                    # value is outside the aspiration window, search again with a wider window
+                    delta *= 2
+                    if value <= alpha:
+                        alpha = (value-delta if delta <= ASPIRATION_MAX else math.inf*-1)
+                    else:
+                        beta = (value+delta if delta <= ASPIRATION_MAX else math.inf)
+            except SearchTimeout:
+                break
+            if move is None:
+                break
+            self.best_move = move
+            self.pv = self.pv_table[0][:]
+            self.depth_reached = depth
+            if self.callback is not None:
+                self.callback(depth, value, self.nodes, time.time()-start, self.getPV())
+            # stop if a mate has been found
+            if abs(value) >= MATE-MAX_PLY or self.isFinished():
+                break
+        self.interruptible = False
+        self.deadline = None
+        self.elapsed = time.time()-start
+        if self.profiler is not None:
+            self.profiler.stop()
+        return self.best_move
+
+    def getPV(self):
+        """
+        Return:
+            pv : principal variation of the last completed iteration, ie, list of (from, to, promotion)-moves
+                 starting with the best move (the line ends early at tablebase hits)
+        """
+        return self.pv[:]
+
+    def setTimeout(self, timeout):
+        if timeout is not None:
+            self.budget = timeout
+            self.deadline = time.time()+timeout
+
+    def isTimeout(self):
+        # whether the current iteration has to be interrupted
+        return self.interruptible and (self.stop_event.is_set() or (self.deadline is not None and time.time() > self.deadline)
+                                       or (self.max_nodes is not None and self.nodes >= self.max_nodes))
+
+    def isFinished(self):
+        # whether to start no further iterations, ie, when stopped or when the next iteration is not going to finish
+        deadline = self.deadline
+        return (self.stop_event.is_set() or (deadline is not None and time.time() > deadline-self.budget*0.5)
+                or (self.max_nodes is not None and self.nodes >= self.max_nodes))
+
+    def stop(self):
+        # stop the search as soon as possible, the result of the last completed iteration is returned
+        self.stop_event.set()
+
+    def prepare(self):
+        # clear the stop signal and deadline left behind by stop and ponderHit, before a controlling
+        # thread starts a new search
+        self.stop_event.clear()
+        self.deadline = None
+
+    def getPonderPosition(self, state, score, ep, castle):
         """
         Arguments:
-            color : the current player for which we would like to calculate possible moves and scores
-            state : the (current) state of game 
-            score : list of scores for both opponents for current state
+            state : the (current) state of game, with the opponent of the engine to move
+            score : list of scores for both opponents
             ep : state for en-passant
             castle : state for castling
         Return:
-            ret_states : list of (c, p, s, score, ep, castle)-tuples 
-        """
-        # init states
-        ret_states = []
-        # get all possible components
-        comps = getComponents(color, state)
-        # run over components and get score for all possible positions
-        for c in comps:
-            c_pos = getValidPositions(c, state, self.orientation, ep, castle)
-            for cp in c_pos:
-                # also check whether the current move does not lead to a check
-                if not isCheck(c, cp, state, self.orientation):
-                    if ep is not None:
-                        ret_states.append(self.applyMove(c, cp, np.copy(state), score.copy(), self.orientation, ep.copy(), castle.copy(), (color==self.color)))        
-                    else:
-                        ret_states.append(self.applyMove(c, cp, np.copy(state), score.copy(), self.orientation, None, castle.copy(), (color==self.color)))
+            position : position after the expected reply of the opponent (from the transposition
+                       table), on which the engine can search while the opponent is thinking (None
+                       if there is no expected reply)
+        """
+        position = Position.fromState(state, self.orientation, ep, castle, ("white" if self.color == "black" else "black"), score)
+        entry = self.tt.probe(position.key)
+        if entry is None or not entry[3]:
+            return None
+        move = unpackMove(entry[3])
+        if move not in position.legalMoves(promotions=(self.getPromotion(),)):
+            return None
+        position.makeMove(move)
+        # pondering searches without time budget, until stopped or until ponderHit is called
+        self.prepare()
+        self.ponder_key = position.key
+        return position
 
-        random.shuffle(ret_states)
-        return ret_states
+    def isPonderHit(self, state, score, ep, castle):
+        # whether the opponent played the expected reply
+        position = Position.fromState(state, self.orientation, ep, castle, self.color, score)
+        return position.key == self.ponder_key
 
-    def getPromotion(self):
-        # just pick queen (TODO could be improved)
-        return 3
+    def ponderHit(self, timeout):
+        # the pondering search continues as regular search with the given time budget
+        self.setTimeout(timeout)
 
-    def applyMove(self, comp, comppos, state, score, orientation, ep, castle, opponent):
+    def ponder(self, position):
         """
-        Important: arguments that are going to be modified: state, score, ep, castle 
+        Arguments:
+            position : position returned by getPonderPosition
+        Return:
+            comp : component of best move
+            pos : new position of component
+        """
+        move = self.search(position)
+        if move is None:
+            return None, None
+        return toCoord(move[0]), toCoord(move[1])
+
+    def searchParallel(self, position):
+        """
+        Root-parallel iterative deepening. Each root move is owned by one worker process for the
+        whole search. In each iteration, the first root move (ie, the best move of the previous
+        iteration) is searched with a full window. The remaining root moves are then searched by
+        their owners with a null window around the value of the first move (late quiet moves at
+        reduced depth), and again with a full window above it on a fail high. Workers keep their
+        transposition table and move ordering heuristics in between iterations and are only
+        reset at the start of a search. Without a seed, workers raise alpha through shared
+        memory. With a seed, alpha is the value of the first move and the seeds of the workers
+        are drawn from the generator of the engine, such that the result does not depend on the
+        timing of the workers.
 
         Arguments:
-            comp : component of move to be applied
-            comppos : new position of component
-            state : the (current, ie, before new move) state of game
-            score : list of scores for both opponents for current (ie, before new move) state
-            orientation : orientation of the game 
-            ep : current (ie, before new move) state for en-passant
-            castle : current (ie, before new move) state for castling
-            opponent : whether the component of the applied move represents a component of the opponent 
+            position : the (current) bitboard position of game
         Return:
-            comp : component of move applied
-            comppos : position of applied move of component
-            state : new state of game after applied move 
-            score : new score of game after applied move 
-            ep : new ep state of game after applied move
-            castle : new castle state of game after applied move
-        """
-        poption = None
-        # checks for double pawn or en passant 
-        if comppos[1]==comp[1] and abs(comppos[0]-comp[0])==2 and state[comp] in [1,7]:
-            ep = list(comppos)
-        elif state[comp] in [1,7] and state[comppos]==0 and comppos[0]!=comp[0] and comppos[1]!=comp[1] and ep!=None:
-            # en passant move
-            if comppos[0] > comp[0]:
-                state[comppos[0]-1,comppos[1]] = 0
-            else:
-                state[comppos[0]+1,comppos[1]] = 0
-            ep = None
-        else:
-            ep = None
-        # check for pawn promotion
-        if comp[0]!=comppos[0] and state[comp] in [1,7] and (comppos[0]==0 or comppos[0]==7): 
-            poption = self.getPromotion()
-        # check whether we have a rook or king move
-        if state[comp] in [2,8]:
-            if comp==(0,0):
-                castle[0]=True
-            elif comp==(0,7):
-                castle[2]=True
-            elif comp==(7,0):
-                castle[3]=True
-            elif comp==(7,7):
-                castle[5]=True
-        if state[comp] in [6,12]:
-            if (comp==(0,4) and state[comp]==6) or (comp==(0,3) and state[comp]==12):
-                castle[1]=True
-            elif (comp==(7,3) and state[comp]==6) or (comp==(7,4) and state[comp]==12):
-                castle[4]=True
-            # check if castled -> change rooks
-            if abs(comp[1]-comppos[1])==2:
-                # check if W or E
-                if comp[1]<comppos[1]:
-                    state[comppos[0],comppos[1]-1] = state[comp[0],7]
-                    state[comp[0],7] = 0
+            best_move : best (from, to, promotion)-move of the last completed iteration
+        """
+        start = time.time()
+        self.nodes = 0
+        self.best_move = None
+        self.pv = []
+        self.resetOrdering()
+        self.getWorkers()
+        moves = self.getStates(position)[:]
+        if len(moves) <= 1:
+            self.deadline = None
+            self.pv = moves[:]
+            return (moves[0] if len(moves) == 1 else None)
+        self.search_id += 1
+        owners = {m: i % self.threads for i, m in enumerate(moves)}
+        seeds = [(None if self.seed is None else self.rng.getrandbits(32)) for _ in range(self.threads)]
+        self.shared_stop.clear()
+        for depth in range(1, self.depth+1):
+            self.interruptible = depth > 1
+            # a root move is always searched by the same worker, which keeps its subtree in its table
+            w = owners[moves[0]]
+            results, interrupted = self.runWorkers({w: (self.search_id, seeds[w], position, depth, None, [(0, moves[0])])})
+            if interrupted:
+                break
+            _, value, pv = results[0]
+            best = 0
+            self.shared_alpha.value = value
+            tasks = {}
+            for i in range(1, len(moves)):
+                w = owners[moves[i]]
+                if w not in tasks:
+                    tasks[w] = (self.search_id, seeds[w], position, depth, value, [])
+                tasks[w][5].append((i, moves[i]))
+            results, interrupted = self.runWorkers(tasks)
+            if interrupted:
+                break
+            # moves which do not improve on the first move have no value, ties are broken by the order of the root moves
+            for i, v, line in sorted(results, key=lambda r: r[0]):
+                if v is not None and v > value:
+                    best, value, pv = i, v, line
+            self.best_move = moves[best]
+            self.pv = [self.best_move]+pv
+            self.depth_reached = depth
+            if self.callback is not None:
+                self.callback(depth, value, self.nodes, time.time()-start, self.getPV())
+            # best move is searched first in the next iteration
+            moves = [moves[best]]+moves[:best]+moves[best+1:]
+            if abs(value) >= MATE-MAX_PLY or self.isFinished():
+                break
+        self.interruptible = False
+        self.deadline = None
+        return self.best_move
+
+    def runWorkers(self, tasks):
+        """
+        Arguments:
+            tasks : dictionary of tasks (see _searchRootMoves) by index of the worker
+        Return:
+            results : list of (index, value, pv)-triples of all tasks
+            interrupted : whether any of the workers was interrupted
+        """
+        for w, task in tasks.items():
+            self.workers[w][1].put(task)
+        results, interrupted = [], False
+        for _ in range(len(tasks)):
+            # workers are interrupted through the shared stop signal
+            while True:
+                try:
+                    task_results, nodes, stopped = self.results.get(timeout=POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    if self.isTimeout():
+                        self.shared_stop.set()
+            results.extend(task_results)
+            self.nodes += nodes
+            interrupted = interrupted or stopped
+        return results, interrupted
+
+    def getWorkers(self):
+        if self.workers is None:
+            self.shared_alpha = multiprocessing.Value("d", math.inf*-1)
+            self.shared_stop = multiprocessing.Event()
+            self.results = multiprocessing.Queue()
+            self.workers = []
+            for _ in range(self.threads):
+                tasks_queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=_runWorker, args=(self.params, tasks_queue, self.results, self.shared_alpha, self.shared_stop), daemon=True)
+                process.start()
+                self.workers.append((process, tasks_queue))
+        return self.workers
+
+    def close(self):
+        # stop the worker processes (if any) and close the opening book and tablebases
+        if self.workers is not None:
+            for process, _ in self.workers:
+                process.terminate()
+                process.join()
+            self.workers = None
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.tablebases is not None:
+            self.tablebases.close()
+            self.tablebases = None
+
+    def alphabeta(self, position, depth, alpha, beta, ply, allownull=True):
+        """
+        Negamax formulation of alpha-beta search on a single mutable position. Moves are made and
+        unmade in place, hence, position is restored when the call returns. Principal variation
+        search: the first move is searched with the full window, later moves with a null window,
+        and only if they turn out to raise alpha with the full window. The search is made selective
+        by null-move pruning, late move reductions and futility pruning (if enabled). The principal
+        variation from this node on is left in self.pv_table[ply].
+
+        Arguments:
+            position : the (current) bitboard position of game, holding state, score, ep, castle and player to move
+            depth : remaining depth in game tree
+            alpha : alpha score
+            beta : beta score
+            ply : distance to the root of the game tree
+            allownull : whether a null move may be tried (not twice in a row)
+        Return:
+            best_move : best (from, to, promotion)-move for the player to move (None for terminal nodes)
+            score : score of best move from the perspective of the player to move
+        """
+        color = position.color
+        self.nodes += 1
+        if self.nodes % CHECK_NODES == 0 and self.isTimeout():
+            raise SearchTimeout()
+        self.pv_table[ply] = []
+        if self.tablebases is not None and ply > 0:
+            value = self.probeTablebases(position, ply)
+            if value is not None:
+                return None, value
+        # probe transposition table
+        hash_move = None
+        entry = self.tt.probe(position.key)
+        if entry is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry
+            hash_move = (unpackMove(tt_move) if tt_move else None)
+            # no cutoffs in PV nodes (searched with an open window), such that the principal variation is complete
+            if tt_depth >= depth and ply > 0 and beta-alpha <= 2*NULL_WINDOW:
+                tt_value = valueFromTT(tt_value, ply)
+                if tt_flag == EXACT:
+                    return hash_move, tt_value
+                elif tt_flag == LOWER:
+                    alpha = max(alpha, tt_value)
                 else:
-                    state[comppos[0],comppos[1]+1] = state[comp[0],0]
-                    state[comp[0],0] = 0
-        # check if piece is captured
-        if state[comppos] != 0:
-            # get points
-            points = 0
-            if state[comppos] in [1,7]:
-                points = 1
-            elif state[comppos] in [2,8]:
-                points = 5
-            elif state[comppos] in [5,11]:
-                points = 9
-            else:
-                points = 3
-            if opponent:
-                score[1] += points
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return hash_move, tt_value
+        if ply == 0 and self.best_move is not None:
+            # best move of previous iteration
+            hash_move = self.best_move
+        alpha_orig = alpha
+        if depth == 0:
+            # we reached a terminal node (either due to depth=0 or checkmate)
+            if self.quiescence:
+                return None, self.quiesce(position, alpha, beta, ply, 0)
+            if position.isStalemated(color):
+                # checkmate or stalemate
+                return None, (-(MATE-ply) if position.isChecked(color) else 0)
+            return None, self.evaluateLeaf(position)
+        checked = position.isChecked(color)
+        # null-move pruning: if passing the turn still fails high, a move will too, which does not hold
+        # in zugzwang (likely when only pawns are left)
+        if (self.nullmove and allownull and ply > 0 and depth >= NULL_MIN_DEPTH and not checked
+                and abs(beta) < MATE-MAX_PLY and position.hasPieces(color) and position.evaluate() >= beta):
+            undo = position.makeNullMove()
+            _, s = self.alphabeta(position, depth-1-NULL_REDUCTION-(depth > 6), -beta, -beta+NULL_WINDOW, ply+1, False)
+            position.unmakeNullMove(undo)
+            if -s >= beta:
+                return None, beta
+        # get all possible moves, ordered
+        moves = self.getStates(position, ply, hash_move)
+        if len(moves) == 0:
+            # checkmate or stalemate
+            return None, (-(MATE-ply) if checked else 0)
+        best_move, best_value = None, math.inf*-1
+        if depth == 1 and not self.quiescence:
+            # all children are leaves, hence, evaluate them at once
+            values = self.evaluateChildren(position, moves, ply)
+            i = max(range(len(moves)), key=lambda i: (values[i], -i))
+            best_move, best_value = moves[i], values[i]
+            self.pv_table[ply] = [best_move]
+            moves = []
+        # quiet moves (which do not give check) are futile if even a large gain does not reach alpha
+        futility_value = None
+        if self.futility and len(moves) > 1 and depth < len(FUTILITY_MARGINS) and not checked and abs(alpha) < MATE-MAX_PLY:
+            futility_value = position.evaluate()+FUTILITY_MARGINS[depth]
+            if futility_value > alpha:
+                futility_value = None
+        killers = (self.killers[ply] if ply < MAX_PLY else [])
+        for i, m in enumerate(moves):
+            undo = position.makeMove(m)
+            r = 0
+            if (i > 0 and not checked and undo[1] == 0 and m[2] is None
+                    and (futility_value is not None or (self.lmr and depth >= LMR_MIN_DEPTH and i >= LMR_MOVES and m not in killers))
+                    and not position.isChecked(position.color)):
+                if futility_value is not None:
+                    position.unmakeMove(m, undo)
+                    best_value = max(best_value, futility_value)
+                    continue
+                r = (2 if i >= LMR_DEEP_MOVES and depth > LMR_MIN_DEPTH else 1)
+            if i == 0:
+                _, s = self.alphabeta(position, depth-1, -beta, -alpha, ply+1)
+                s = -s
             else:
-                score[0] += points
-        if poption is not None:
-            if poption==0:
-                state[comppos] = 4+((state[comp]//7)*6)
-            elif poption==1:
-                state[comppos] = 3+((state[comp]//7)*6)   
-            elif poption==2:
-                state[comppos] = 2+((state[comp]//7)*6)   
+                # null window search (reduced for late moves), which is repeated with the full window
+                # (and at full depth) if the move turns out to raise alpha
+                _, s = self.alphabeta(position, depth-1-r, -alpha-NULL_WINDOW, -alpha, ply+1)
+                s = -s
+                if s > alpha and (r > 0 or s < beta):
+                    _, s = self.alphabeta(position, depth-1, -beta, -alpha, ply+1)
+                    s = -s
+            position.unmakeMove(m, undo)
+            if s > best_value:
+                best_value = s
+                best_move = m
+                if s > alpha:
+                    self.pv_table[ply] = [m]+self.pv_table[ply+1]
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                self.cutoffs[i] += 1
+                if undo[1] == 0 and m[2] is None:
+                    self.updateQuiet(color, m, depth, ply)
+                break
+        # store result together with the type of bound
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(position.key, depth, valueToTT(best_value, ply), flag, packMove(best_move))
+        return best_move, best_value
+
+    def probeTablebases(self, position, ply):
+        """
+        Arguments:
+            position : the (current) bitboard position of game
+            ply : distance to the root of the game tree
+        Return:
+            value : exact value of position from the perspective of the player to move (None if not covered)
+        """
+        result, plies = self.tablebases.probe(position)
+        if result is None:
+            return None
+        self.tablebase_hits += 1
+        return (0 if result == 0 else result*(MATE-(ply+plies)))
+
+    def evaluateLeaf(self, position):
+        # full evaluation (incl. mobility and king safety) of a leaf node
+        return evaluatePosition(position)
+
+    def evaluateChildren(self, position, moves, ply):
+        """
+        Arguments:
+            position : the (current) bitboard position of game
+            moves : list of legal moves in position
+            ply : distance to the root of the game tree
+        Return:
+            values : list of values of the positions after each move, from the perspective of the player to move
+        """
+        values, boards, leaves = [0]*len(moves), [], []
+        for i, m in enumerate(moves):
+            self.nodes += 1
+            undo = position.makeMove(m)
+            value = (self.probeTablebases(position, ply+1) if self.tablebases is not None else None)
+            if value is not None:
+                values[i] = -value
+            elif position.isStalemated(position.color):
+                # checkmate or stalemate
+                values[i] = (MATE-(ply+1) if position.isChecked(position.color) else 0)
             else:
-                state[comppos] = 5+((state[comp]//7)*6)   
+                boards.append(position.board[:])
+                leaves.append(i)
+            position.unmakeMove(m, undo)
+        if len(boards) > 0:
+            for i, v in zip(leaves, evaluateBatch(boards, position.up, 1-position.color).tolist()):
+                values[i] = -v
+        return values
+
+    def quiesce(self, position, alpha, beta, ply, qply):
+        """
+        Quiescence search: only captures and promotions (and, optionally, checks on the first
+        ply) are searched, such that leaf nodes are not evaluated in the middle of an exchange.
+
+        Arguments:
+            position : the (current) bitboard position of game
+            alpha : alpha score
+            beta : beta score
+            ply : distance to the root of the game tree
+            qply : distance to the root of the quiescence search
+        Return:
+            score : score from the perspective of the player to move
+        """
+        color = position.color
+        self.nodes += 1
+        if self.nodes % CHECK_NODES == 0 and self.isTimeout():
+            raise SearchTimeout()
+        checked = position.isChecked(color)
+        if checked:
+            # all evasions are searched, there is no standing pat when in check
+            moves = self.getStates(position, ply)
+            if len(moves) == 0:
+                return -(MATE-ply)
+            stand_pat = math.inf*-1
+            if qply >= self.qdepth or ply >= MAX_PLY-1:
+                return position.evaluate()
         else:
-            state[comppos] = state[comp]
-        state[comp] = 0 
-        return comp, comppos, state, score, ep, castle
+            stand_pat = position.evaluate()
+            if stand_pat >= beta or qply >= self.qdepth or ply >= MAX_PLY-1:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = self.getStates(position, ply, capturesonly=True)
+            if self.qchecks and qply == 0:
+                moves.extend(self.getChecks(position))
+        best_value = stand_pat
+        for m in moves:
+            if not checked and m[2] is None:
+                # delta pruning: skip captures which cannot raise alpha, even with some margin
+                points = position.capturePoints(m)
+                if points > 0 and stand_pat+points+DELTA_MARGIN < alpha:
+                    continue
+            undo = position.makeMove(m)
+            s = -self.quiesce(position, -beta, -alpha, ply+1, qply+1)
+            position.unmakeMove(m, undo)
+            if s > best_value:
+                best_value = s
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                break
+        return best_value
+
+    def getChecks(self, position):
+        # quiet moves which give check
+        checks = []
+        color = position.color
+        for m in position.legalMoves(promotions=(self.getPromotion(),)):
+            if m[2] is None and position.capturePoints(m) == 0:
+                undo = position.makeMove(m)
+                if position.isChecked(1-color):
+                    checks.append(m)
+                position.unmakeMove(m, undo)
+        return checks
+
+    def getStates(self, position, ply=0, hash_move=None, capturesonly=False):
+        """
+        Arguments:
+            position : the (current) bitboard position of game
+            ply : distance to the root of the game tree (for killer moves)
+            hash_move : move to search first (eg, from the transposition table)
+            capturesonly : only return captures and promotions
+        Return:
+            moves : list of legal (from, to, promotion)-moves, ordered by hash move, captures
+                    (most valuable victim, least valuable attacker), killer moves and history
+                    (the move buffer of ply, which is overwritten by the next call for ply)
+        """
+        moves = position.legalMoves(promotions=(self.getPromotion(),), capturesonly=capturesonly, moves=self.move_buffers[ply])
+        self.rng.shuffle(moves)
+        board = position.board
+        killers = self.killers[ply] if ply < MAX_PLY else [None, None]
+        history = self.history[position.color]
+        def order(m):
+            if m == hash_move:
+                return HASH_SCORE
+            points = position.capturePoints(m)
+            if points > 0 or m[2] is not None:
+                return CAPTURE_SCORE+10*(points+(8 if m[2] is not None else 0))-ATTACKER_VALUES[(board[m[0]]-1) % 6]
+            if m == killers[0]:
+                return KILLER_SCORE+1
+            if m == killers[1]:
+                return KILLER_SCORE
+            return history[m[0]*64+m[1]]
+        moves.sort(key=order, reverse=True)
+        return moves
+
+    def updateQuiet(self, color, move, depth, ply):
+        # quiet move caused a beta cutoff: update killer moves and history
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        history = self.history[color]
+        i = move[0]*64+move[1]
+        history[i] += depth*depth
+        if history[i] > HISTORY_MAX:
+            # age history scores
+            for j in range(4096):
+                history[j] //= 2
+
+    def getPromotion(self):
+        # just pick queen (TODO could be improved)
+        return 3
+
+# state of a worker process of the root-parallel search
+_worker = None
+_shared_alpha = None
+_search_id = None
+
+def _runWorker(params, tasks_queue, results, shared_alpha, shared_stop):
+    global _worker, _shared_alpha
+    _worker = ABPEngine(**params)
+    # the worker is interrupted by the main process only
+    _worker.stop_event = shared_stop
+    _worker.interruptible = True
+    _shared_alpha = shared_alpha
+    for task in iter(tasks_queue.get, None):
+        results.put(_searchRootMoves(task))
+
+def _searchRootMoves(task):
+    """
+    Arguments:
+        task : (search id, seed, position, depth, alpha, moves)-tuple, where moves is a list of (index, root move)-pairs
+               and alpha is None for the first root move, which is searched with a full window
+    Return:
+        results : list of (index, value, pv)-triples, value is None for moves which do not improve on alpha
+        nodes : number of visited nodes
+        interrupted : whether the search was interrupted
+    """
+    global _search_id
+    search_id, seed, position, depth, alpha, moves = task
+    engine = _worker
+    if search_id != _search_id:
+        # first task of a new search
+        _search_id = search_id
+        engine.resetOrdering()
+        engine.tt.newSearch()
+        if seed is not None:
+            engine.tt.clear()
+            engine.rng.seed(seed)
+    engine.nodes = 0
+    engine.best_move = None
+    results = []
+    checked = position.isChecked(position.color)
+    for i, move in moves:
+        undo = position.makeMove(move)
+        try:
+            if alpha is None:
+                _, value = engine.alphabeta(position, depth-1, math.inf*-1, math.inf, 1)
+                value = -value
+            else:
+                a = (max(alpha, _shared_alpha.value) if seed is None else alpha)
+                # late quiet moves are reduced as in alphabeta
+                r = 0
+                if (engine.lmr and depth >= LMR_MIN_DEPTH and i >= LMR_MOVES and not checked and undo[1] == 0
+                        and move[2] is None and not position.isChecked(position.color)):
+                    r = (2 if i >= LMR_DEEP_MOVES and depth > LMR_MIN_DEPTH else 1)
+                _, value = engine.alphabeta(position, depth-1-r, -a-NULL_WINDOW, -a, 1)
+                value = -value
+                if value > a:
+                    # fail high, search again at full depth with a full window above alpha
+                    _, value = engine.alphabeta(position, depth-1, math.inf*-1, -a, 1)
+                    value = -value
+                if value <= a:
+                    value = None
+        except SearchTimeout:
+            return results, engine.nodes, True
+        finally:
+            position.unmakeMove(move, undo)
+        if value is not None:
+            with _shared_alpha.get_lock():
+                if value > _shared_alpha.value:
+                    _shared_alpha.value = value
+        results.append((i, value, engine.pv_table[1][:]))
+    return results, engine.nodes, False
@@ -0,0 +1,136 @@
+"""
+File containing code for the batch analysis of EPD files.
+Author: Thomas Mortier
+Date: October 2026
+
+Positions are read lazily from the input, searched by a pool of worker
+processes and written in input order as soon as they are available. At most
+a fixed number of positions is in flight, hence, memory use does not depend
+on the size of the input. For each position the following EPD opcodes are
+appended to the operations of the input: acd (depth), acn (nodes), acs
+(seconds), ce (centipawns, from the perspective of the player to move) or dm
+(mate in moves) and pv (moves in long algebraic notation).
+
+Usage:
+    python -m simplechess.epd positions.epd -o analysis.epd -j 8 --movetime 0.1
+    cat positions.epd | python -m simplechess.epd --nodes 20000 > analysis.epd
+"""
+import sys
+import os
+import argparse
+import time
+import collections
+import multiprocessing
+
+from simplechess.bitboard import Position
+from simplechess.engine import ABPEngine, MATE, MAX_PLY
+from simplechess.fen import parseFen, toFen, toUci
+
+# maximum depth for searches which are limited by time or nodes
+MAX_DEPTH = 64
+# number of positions in flight per worker
+WINDOW = 4
+ORIENTATION = "white"
+
+# engine of a worker process
+_engine = None
+_last = None
+
+def _record(depth, value, nodes, elapsed, pv):
+    global _last
+    _last = (depth, value, pv)
+
+def _initWorker(depth, hash_size):
+    global _engine
+    _engine = ABPEngine("white", ORIENTATION, depth, hash_size)
+    _engine.callback = _record
+
+def analyseLine(task):
+    """
+    Arguments:
+        task : (EPD line, time budget, node budget)-tuple
+    Return:
+        line : EPD line with the results of the analysis (or the original line with a comment in case of an error)
+    """
+    global _last
+    line, movetime, maxnodes = task
+    fields = line.split()
+    try:
+        state, ep, castle, color = parseFen(" ".join(fields[:4]), ORIENTATION)
+    except (ValueError, IndexError, KeyError):
+        return '{0} c0 "invalid position";'.format(line)
+    position = Position.fromState(state, ORIENTATION, ep, castle, color)
+    _last = None
+    start = time.time()
+    _engine.search(position, movetime, maxnodes)
+    elapsed = time.time()-start
+    # normalized position followed by the operations of the input
+    fen = " ".join(toFen(state, ORIENTATION, ep, castle, color).split()[:4]+fields[4:])
+    if _last is None:
+        # no legal moves
+        return "{0} acd 0; acn {1}; acs {2:.3f};".format(fen, _engine.nodes, elapsed)
+    depth, value, pv = _last
+    if abs(value) >= MATE-MAX_PLY:
+        plies = MATE-abs(value)
+        score = "dm {0};".format((plies+1)//2 if value > 0 else -((plies+1)//2))
+    else:
+        score = "ce {0};".format(int(round(value*100)))
+    return "{0} acd {1}; acn {2}; acs {3:.3f}; {4} pv {5};".format(fen, depth, _engine.nodes, elapsed, score, " ".join(toUci(m, ORIENTATION) for m in pv))
+
+def readPositions(stream):
+    # EPD lines, without empty lines and comments
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+def analyse(stream, out, jobs, depth=MAX_DEPTH, movetime=None, maxnodes=None, hash_size=16, log=sys.stderr):
+    """
+    Analyse all positions of stream and write the results to out, in input order.
+
+    Return:
+        count : number of analysed positions
+    """
+    count, start = 0, time.time()
+    pending = collections.deque()
+    with multiprocessing.Pool(jobs, initializer=_initWorker, initargs=(depth, hash_size)) as pool:
+        lines = readPositions(stream)
+        while True:
+            # keep the pool busy, but bound the number of positions in memory
+            while len(pending) < jobs*WINDOW:
+                line = next(lines, None)
+                if line is None:
+                    break
+                pending.append(pool.apply_async(analyseLine, ((line, movetime, maxnodes),)))
+            if len(pending) == 0:
+                break
+            out.write(pending.popleft().get()+"\n")
+            count += 1
+            if log is not None and count % 1000 == 0:
+                out.flush()
+                log.write("{0} positions ({1:.1f} positions/sec)\n".format(count, count/(time.time()-start)))
+    out.flush()
+    return count
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Simple Chess EPD analysis")
+    parser.add_argument("input", nargs="?", default=None)
+    parser.add_argument("-o", "--output", dest="output", default=None)
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=os.cpu_count())
+    parser.add_argument("-d", "--depth", dest="depth", type=int, default=None)
+    parser.add_argument("--movetime", dest="movetime", type=float, default=None)
+    parser.add_argument("--nodes", dest="nodes", type=int, default=None)
+    parser.add_argument("--hash", dest="hash", type=int, default=16)
+    args = parser.parse_args()
+    if args.depth is None and args.movetime is None and args.nodes is None:
+        parser.error("at least one of --depth, --movetime and --nodes is required")
+    depth = min(args.depth if args.depth is not None else MAX_DEPTH, MAX_DEPTH)
+    stream = (open(args.input) if args.input is not None else sys.stdin)
+    out = (open(args.output, "w") if args.output is not None else sys.stdout)
+    try:
+        analyse(stream, out, args.jobs, depth, args.movetime, args.nodes, args.hash)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,242 @@
+"""
+File containing code for the static evaluation of positions.
+Author: Thomas Mortier
+Date: October 2026
+
+Material and piece-square tables are kept incrementally by Position (scalar
+path, see Position.evaluate), for the middlegame and the endgame, and tapered
+by the game phase (see taper, which both paths use). Mobility and king safety are computed with vectorized
+NumPy operations over a batch of boards, such that all children of a node can
+be scored at once (batch path, see evaluateBatch). Values are in centipawns
+internally and returned in points (pawn = 1), like the score of the game.
+"""
+import numpy as np
+
+from simplechess.tables import KNIGHT_OFFSETS, KING_OFFSETS, DIRECTIONS, ORTHOGONAL, DIAGONAL
+
+BLACK, WHITE = 0, 1
+
+# material (index: component type, ie, (component-1)%6), in line with the points of captures
+MATERIAL = [100, 500, 300, 300, 900, 0]
+
+# piece-square tables from the perspective of the colour whose pawns move towards row 0, the
+# tables are symmetric in the columns, hence, they also hold for the rotated board of orientation black
+PST = [
+    # pawn
+    [  0,   0,   0,   0,   0,   0,   0,   0,
+      50,  50,  50,  50,  50,  50,  50,  50,
+      10,  10,  20,  30,  30,  20,  10,  10,
+       5,   5,  10,  25,  25,  10,   5,   5,
+       0,   0,   0,  20,  20,   0,   0,   0,
+       5,  -5, -10,   0,   0, -10,  -5,   5,
+       5,  10,  10, -20, -20,  10,  10,   5,
+       0,   0,   0,   0,   0,   0,   0,   0],
+    # rook
+    [  0,   0,   0,   0,   0,   0,   0,   0,
+       5,  10,  10,  10,  10,  10,  10,   5,
+      -5,   0,   0,   0,   0,   0,   0,  -5,
+      -5,   0,   0,   0,   0,   0,   0,  -5,
+      -5,   0,   0,   0,   0,   0,   0,  -5,
+      -5,   0,   0,   0,   0,   0,   0,  -5,
+      -5,   0,   0,   0,   0,   0,   0,  -5,
+       0,   0,   0,   5,   5,   0,   0,   0],
+    # knight
+    [-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20,   0,   0,   0,   0, -20, -40,
+     -30,   0,  10,  15,  15,  10,   0, -30,
+     -30,   5,  15,  20,  20,  15,   5, -30,
+     -30,   0,  15,  20,  20,  15,   0, -30,
+     -30,   5,  10,  15,  15,  10,   5, -30,
+     -40, -20,   0,   5,   5,   0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50],
+    # bishop
+    [-20, -10, -10, -10, -10, -10, -10, -20,
+     -10,   0,   0,   0,   0,   0,   0, -10,
+     -10,   0,   5,  10,  10,   5,   0, -10,
+     -10,   5,   5,  10,  10,   5,   5, -10,
+     -10,   0,  10,  10,  10,  10,   0, -10,
+     -10,  10,  10,  10,  10,  10,  10, -10,
+     -10,   5,   0,   0,   0,   0,   5, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20],
+    # queen
+    [-20, -10, -10,  -5,  -5, -10, -10, -20,
+     -10,   0,   0,   0,   0,   0,   0, -10,
+     -10,   0,   5,   5,   5,   5,   0, -10,
+      -5,   0,   5,   5,   5,   5,   0,  -5,
+      -5,   0,   5,   5,   5,   5,   0,  -5,
+     -10,   0,   5,   5,   5,   5,   0, -10,
+     -10,   0,   0,   0,   0,   0,   0, -10,
+     -20, -10, -10,  -5,  -5, -10, -10, -20],
+    # king
+    [-30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+      20,  20,   0,   0,   0,   0,  20,  20,
+      20,  30,  10,   0,   0,  10,  30,  20]]
+
+# endgame piece-square tables, which differ from the middlegame ones for pawns (advancement) and the king (centralization)
+PST_ENDGAME = PST[:]
+PST_ENDGAME[0] = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  10,  10,  10,  10,  10,  10,
+     10,  10,  10,  10,  10,  10,  10,  10,
+      0,   0,   0,   0,   0,   0,   0,   0]
+PST_ENDGAME[5] = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+
+# game phase: weight per component type, the phase goes from PHASE_TOTAL (all pieces on the board) down to 0 (pawn endgame)
+PHASE_WEIGHTS = [0, 2, 1, 1, 4, 0]
+PHASE_TOTAL = 24
+# weight per component (index: component, 0 is an empty square)
+PHASE = [0]+[PHASE_WEIGHTS[(p-1) % 6] for p in range(1, 13)]
+
+# mobility (per attacked square which is not occupied by an own component), index: component type
+MOBILITY = [0, 2, 4, 4, 1, 0]
+# king safety: bonus per pawn in front of the king, penalty per attacked square around the king
+SHIELD = 10
+KING_ATTACK = 5
+# non-pawn material of one side at the start of the game, king safety is scaled down as the opponent loses material
+NONPAWN_MATERIAL = 2*MATERIAL[1]+2*MATERIAL[2]+2*MATERIAL[3]+MATERIAL[4]
+
+def _psqt(up, pst):
+    # material plus piece-square value (in centipawns) for the owner, indexed by [component][sq]
+    table = [[0]*64]
+    for p in range(1, 13):
+        color, t = (p-1)//6, (p-1) % 6
+        # the other colour sees the board mirrored vertically
+        flip = (0 if color == up else 56)
+        table.append([MATERIAL[t]+pst[t][sq ^ flip] for sq in range(64)])
+    return table
+
+def _signed(table):
+    # table as numpy array, signed such that white is positive
+    return np.array([[v*(1 if (p-1)//6 == WHITE else -1) if p else 0 for v in table[p]] for p in range(13)])
+
+# scalar tables for the middlegame and endgame, indexed by [up][component][sq]
+PSQT = [_psqt(BLACK, PST), _psqt(WHITE, PST)]
+PSQT_ENDGAME = [_psqt(BLACK, PST_ENDGAME), _psqt(WHITE, PST_ENDGAME)]
+# same tables as numpy arrays
+PSQT_SIGNED = [_signed(PSQT[up]) for up in (BLACK, WHITE)]
+PSQT_ENDGAME_SIGNED = [_signed(PSQT_ENDGAME[up]) for up in (BLACK, WHITE)]
+PHASE_ARRAY = np.array(PHASE)
+SQUARES = np.arange(64)
+
+def taper(middlegame, endgame, phase):
+    """
+    Arguments:
+        middlegame : middlegame value(s)
+        endgame : endgame value(s)
+        phase : game phase(s), at most PHASE_TOTAL (promotions may push the phase beyond, hence, clip first)
+    Return:
+        value : interpolation between the middlegame and endgame value(s), scalar or numpy array
+    """
+    return (middlegame*phase+endgame*(PHASE_TOTAL-phase))/PHASE_TOTAL
+
+def _shift(a, dr, dc):
+    # move the contents of a (N,8,8)-array by (dr, dc), contents shifted off the board are dropped
+    out = np.zeros_like(a)
+    out[:, max(dr, 0):8+min(dr, 0), max(dc, 0):8+min(dc, 0)] = a[:, max(-dr, 0):8+min(-dr, 0), max(-dc, 0):8+min(-dc, 0)]
+    return out
+
+def _attacks(boards, empty, own, color, up):
+    # attack maps and mobility (in centipawns) of all components of color
+    attacks = np.zeros(boards.shape, dtype=bool)
+    mobility = np.zeros(len(boards), dtype=int)
+    base = 6*color+1
+    # pawns
+    pawns = boards == base
+    dr = (-1 if color == up else 1)
+    attacks |= _shift(pawns, dr, -1) | _shift(pawns, dr, 1)
+    # knights
+    knights = boards == base+2
+    if knights.any():
+        for dr, dc in KNIGHT_OFFSETS:
+            targets = _shift(knights, dr, dc)
+            attacks |= targets
+            mobility += MOBILITY[2]*(targets & ~own).sum(axis=(1, 2))
+    # sliders: rays are extended one step at a time and stop at the first occupied square
+    for t, directions in ((1, ORTHOGONAL), (3, DIAGONAL), (4, ORTHOGONAL+DIAGONAL)):
+        sliders = boards == base+t
+        if not sliders.any():
+            continue
+        for d in directions:
+            dr, dc = DIRECTIONS[d]
+            ray = sliders
+            for _ in range(7):
+                ray = _shift(ray, dr, dc)
+                attacks |= ray
+                mobility += MOBILITY[t]*(ray & ~own).sum(axis=(1, 2))
+                ray = ray & empty
+                if not ray.any():
+                    break
+    # king
+    king = boards == base+5
+    for dr, dc in KING_OFFSETS:
+        attacks |= _shift(king, dr, dc)
+    return attacks, mobility
+
+def evaluateBatch(boards, up, color):
+    """
+    Evaluate a batch of boards by means of material, piece-square tables, mobility and king safety.
+
+    Arguments:
+        boards : (N,8,8) or (N,64) array of boards (components as in the numpy state)
+        up : index of the colour whose pawns move towards row 0
+        color : index of the colour from whose perspective to evaluate (scalar or (N,) array)
+    Return:
+        values : (N,) array of evaluations (in points)
+    """
+    boards = np.asarray(boards).reshape(-1, 8, 8)
+    n = len(boards)
+    # material and piece-square tables, tapered by the game phase
+    flat = boards.reshape(n, 64)
+    phase = np.minimum(PHASE_ARRAY[flat].sum(axis=1), PHASE_TOTAL)
+    middlegame = PSQT_SIGNED[up][flat, SQUARES].sum(axis=1)
+    endgame = PSQT_ENDGAME_SIGNED[up][flat, SQUARES].sum(axis=1)
+    values = taper(middlegame, endgame, phase)
+    empty = boards == 0
+    owns = [(boards >= 1) & (boards <= 6), boards >= 7]
+    maps = [_attacks(boards, empty, owns[c], c, up) for c in (BLACK, WHITE)]
+    for c in (BLACK, WHITE):
+        base = 6*c+1
+        king = boards == base+5
+        # squares around the king which are attacked by the opponent
+        zone = king.copy()
+        for dr, dc in KING_OFFSETS:
+            zone |= _shift(king, dr, dc)
+        danger = (maps[1-c][0] & zone).sum(axis=(1, 2))
+        # own pawns right in front of the king
+        dr = (-1 if c == up else 1)
+        front = _shift(king, dr, -1) | _shift(king, dr, 0) | _shift(king, dr, 1)
+        shield = ((boards == base) & front).sum(axis=(1, 2))
+        # the fewer attackers the opponent has left, the less king safety matters
+        opponent = 6*(1-c)+1
+        nonpawn = sum(MATERIAL[t]*(boards == opponent+t).sum(axis=(1, 2)) for t in range(1, 5))
+        scale = np.minimum(nonpawn/NONPAWN_MATERIAL, 1.0)
+        term = maps[c][1]+scale*(SHIELD*shield-KING_ATTACK*danger)
+        values += (term if c == WHITE else -term)
+    sign = np.where(np.asarray(color) == WHITE, 1.0, -1.0)
+    return sign*values/100
+
+def evaluatePosition(position):
+    """
+    Arguments:
+        position : bitboard position of game
+    Return:
+        value : evaluation (in points) from the perspective of the player to move
+    """
+    return float(evaluateBatch(np.array(position.board), position.up, position.color)[0])
@@ -0,0 +1,130 @@
+"""
+File containing code for converting between FEN strings and game states.
+Author: Thomas Mortier
+Date: October 2026
+
+Row 0 of the state is the side of the board facing away from the player,
+hence, for orientation "black" the board is rotated by 180 degrees.
+"""
+import numpy as np
+
+STARTPOS = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+FEN_2_IND = {"p": 1, "r": 2, "n": 3, "b": 4, "q": 5, "k": 6}
+
+def toAlgebraic(coord, orientation):
+    # coordinate in state to square name, eg, (6,4) -> "e2" for orientation white
+    if orientation == "white":
+        return "abcdefgh"[coord[1]]+str(8-coord[0])
+    return "hgfedcba"[coord[1]]+str(coord[0]+1)
+
+def fromAlgebraic(name, orientation):
+    col, rank = "abcdefgh".index(name[0]), int(name[1])
+    if orientation == "white":
+        return (8-rank, col)
+    return (rank-1, 7-col)
+
+def toUci(move, orientation):
+    # (from, to, promotion)-move on squares to long algebraic notation, eg, "e2e4" or "e7e8q"
+    frm, to, po = move
+    return toAlgebraic(divmod(frm, 8), orientation)+toAlgebraic(divmod(to, 8), orientation)+("" if po is None else "bnrq"[po])
+
+def fromUci(name, orientation):
+    # inverse of toUci
+    frm, to = fromAlgebraic(name[0:2], orientation), fromAlgebraic(name[2:4], orientation)
+    po = ("bnrq".index(name[4]) if len(name) > 4 else None)
+    return (frm[0]*8+frm[1], to[0]*8+to[1], po)
+
+def parseFen(fen, orientation="white"):
+    """
+    Arguments:
+        fen : FEN string (move counters are optional and ignored)
+        orientation : orientation of the game
+    Return:
+        state : numpy (8,8) state of game
+        ep : state for en-passant (position of pawn which made a double step)
+        castle : state for castling
+        color : color of the player to move
+    """
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError("Invalid FEN {0}!".format(fen))
+    ranks = fields[0].split("/")
+    if len(ranks) != 8:
+        raise ValueError("Invalid FEN {0}!".format(fen))
+    # parse board with row 0 as 8th rank
+    state = np.zeros((8,8), dtype=int)
+    for i, rank in enumerate(ranks):
+        j = 0
+        for ch in rank:
+            if ch.isdigit():
+                j += int(ch)
+            else:
+                if ch.lower() not in FEN_2_IND or j > 7:
+                    raise ValueError("Invalid FEN {0}!".format(fen))
+                state[i,j] = FEN_2_IND[ch.lower()]+(6 if ch.isupper() else 0)
+                j += 1
+        if j != 8:
+            raise ValueError("Invalid FEN {0}!".format(fen))
+    color = ("white" if fields[1] == "w" else "black")
+    # castle flags denote moved rooks/kings: [a8, black king, h8, a1, white king, h1]
+    rights = fields[2]
+    castle = ["q" not in rights, "k" not in rights and "q" not in rights, "k" not in rights,
+              "Q" not in rights, "K" not in rights and "Q" not in rights, "K" not in rights]
+    # ep in FEN is the square behind the pawn, whereas the state stores the pawn itself
+    ep = None
+    if fields[3] != "-":
+        target = fromAlgebraic(fields[3], "white")
+        ep = (target[0]+1 if color == "white" else target[0]-1, target[1])
+    if orientation == "black":
+        state = np.ascontiguousarray(state[::-1,::-1])
+        castle = castle[::-1]
+        if ep is not None:
+            ep = (7-ep[0], 7-ep[1])
+    return state, (list(ep) if ep is not None else None), castle, color
+
+def toFen(state, orientation="white", ep=None, castle=None, color="white", halfmove=0, fullmove=1):
+    """
+    Arguments:
+        state : numpy (8,8) state of game
+        orientation : orientation of the game
+        ep : state for en-passant (position of pawn which made a double step)
+        castle : state for castling
+        color : color of the player to move
+        halfmove : number of half moves since the last capture or pawn move
+        fullmove : move number
+    Return:
+        fen : FEN string
+    """
+    state = np.asarray(state)
+    castle = (list(castle) if castle is not None else [False]*6)
+    if orientation == "black":
+        state = state[::-1,::-1]
+        castle = castle[::-1]
+        if ep is not None:
+            ep = (7-ep[0], 7-ep[1])
+    ind_2_fen = {v: k for k, v in FEN_2_IND.items()}
+    ranks = []
+    for i in range(8):
+        rank, empty = "", 0
+        for j in range(8):
+            p = int(state[i,j])
+            if p == 0:
+                empty += 1
+                continue
+            if empty > 0:
+                rank, empty = rank+str(empty), 0
+            ch = ind_2_fen[(p-1) % 6+1]
+            rank += (ch.upper() if p > 6 else ch)
+        ranks.append(rank+(str(empty) if empty > 0 else ""))
+    # rights require unmoved king and rook on their initial squares
+    rights = ""
+    if not castle[4] and state[7,4] == 12:
+        rights += ("K" if not castle[5] and state[7,7] == 8 else "")+("Q" if not castle[3] and state[7,0] == 8 else "")
+    if not castle[1] and state[0,4] == 6:
+        rights += ("k" if not castle[2] and state[0,7] == 2 else "")+("q" if not castle[0] and state[0,0] == 2 else "")
+    # ep in FEN is the square behind the pawn
+    target = "-"
+    if ep is not None:
+        target = toAlgebraic((ep[0]+1 if state[ep[0],ep[1]] == 7 else ep[0]-1, ep[1]), "white")
+    return "{0} {1} {2} {3} {4} {5}".format("/".join(ranks), ("w" if color == "white" else "b"), (rights if rights else "-"), target, halfmove, fullmove)
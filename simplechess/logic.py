@@ -4,102 +4,86 @@ Author: Thomas Mortier
 Date: March 2021
 """
 import itertools
+import collections
+import threading
 
 import numpy as np
 
+from simplechess.bitboard import Position, toSquare
+from simplechess.tables import N, S, E, W, NE, NW, SE, SW, KNIGHT_COORDS, KING_COORDS, PAWN_CAPTURE_COORDS, RAY_COORDS
+
+# status of the player to move: in check, checkmate, stalemate and legal (from, to, promotion)-moves
+Status = collections.namedtuple("Status", ["checked", "checkmate", "stalemate", "moves"])
+
+# number of positions kept in the status cache (least recently added are dropped first)
+STATUS_CACHE_SIZE = 256
+_status_cache = {}
+# the cache is shared by the GUI and the engine thread
+_status_lock = threading.Lock()
+
+def getStatus(color, state, orientation, ep, castle):
+    """
+    Arguments:
+        color : color of the player to move
+        state : the (current) state of game
+        orientation : orientation of the game
+        ep : state for en-passant
+        castle : state for castling
+    Return:
+        status : Status of color, computed once per position
+    """
+    key = (state.tobytes(), color, orientation, (tuple(ep) if ep is not None else None), tuple(castle))
+    with _status_lock:
+        status = _status_cache.get(key)
+    if status is None:
+        position = Position.fromState(state, orientation, ep, castle, color)
+        moves = tuple(position.legalMoves(promotions=(0, 1, 2, 3)))
+        checked = position.isChecked(position.color)
+        status = Status(checked, checked and len(moves) == 0, not checked and len(moves) == 0, moves)
+        with _status_lock:
+            if len(_status_cache) >= STATUS_CACHE_SIZE:
+                del _status_cache[next(iter(_status_cache))]
+            _status_cache[key] = status
+    return status
+
 def isValidComponentPosition(coord, new_coord, state, orientation, ep, castle):
-    # get all possible valid moves for component
-    moves = getValidPositions(coord, state, orientation, ep, castle)
-    if new_coord in moves:
-        if not isCheck(coord, new_coord, state, orientation):
-            return True
-        else:
-            return False
-    else: 
-        return False
+    # check whether new_coord is among the legal moves of component
+    color = ("black" if state[coord]//7==0 else "white")
+    frm, to = toSquare(coord), toSquare(new_coord)
+    return any(m[0] == frm and m[1] == to for m in getStatus(color, state, orientation, ep, castle).moves)
 
-def getValidPositionsHorizontal(coord, state):
+def getValidPositionsRays(coord, state, directions):
     moves = []
-    # W
-    for j in range(coord[1]-1,-1,-1):
-        if state[coord[0],j]==0:
-            moves.append((coord[0],j))
-        elif state[coord]//7!=state[coord[0],j]//7:
-            moves.append((coord[0],j))
-            break
-        else:
-            break
-    # E
-    for j in range(coord[1]+1,8):
-        if state[coord[0],j]==0:
-            moves.append((coord[0],j))
-        elif state[coord]//7!=state[coord[0],j]//7:
-            moves.append((coord[0],j))
-            break
-        else:
-            break
+    color = state[coord]//7
+    for d in directions:
+        for t in RAY_COORDS[d][coord[0]*8+coord[1]]:
+            if state[t]==0:
+                moves.append(t)
+            elif color!=state[t]//7:
+                moves.append(t)
+                break
+            else:
+                break
     return moves
 
+def getValidPositionsHorizontal(coord, state):
+    return getValidPositionsRays(coord, state, (W, E))
+
 def getValidPositionsVertical(coord, state):
-    moves = []
-    # N
-    for j in range(coord[0]-1,-1,-1):
-        if state[j,coord[1]]==0:
-            moves.append((j,coord[1]))
-        elif state[coord]//7!=state[j,coord[1]]//7:
-            moves.append((j,coord[1]))
-            break
-        else:
-            break
-    # S
-    for j in range(coord[0]+1,8):
-        if state[j,coord[1]]==0:
-            moves.append((j,coord[1]))
-        elif state[coord]//7!=state[j,coord[1]]//7:
-            moves.append((j,coord[1]))
-            break
-        else:
-            break
-    return moves
+    return getValidPositionsRays(coord, state, (N, S))
 
 def getValidPositionsDiagonal(coord, state):
+    return getValidPositionsRays(coord, state, (NW, NE, SW, SE))
+
+def getValidPawnCaptures(coord, state, up, ep):
     moves = []
-    # NW
-    for o in list(range(1,min(coord[0],coord[1])+1)):
-        if state[coord[0]-o,coord[1]-o]==0:
-            moves.append((coord[0]-o,coord[1]-o))
-        elif state[coord]//7!=state[coord[0]-o,coord[1]-o]//7:
-            moves.append((coord[0]-o,coord[1]-o))
-            break
-        else:
-            break
-    # NE
-    for o in list(range(1,min(coord[0],7-coord[1])+1)):
-        if state[coord[0]-o,coord[1]+o]==0:
-            moves.append((coord[0]-o,coord[1]+o))
-        elif state[coord]//7!=state[coord[0]-o,coord[1]+o]//7:
-            moves.append((coord[0]-o,coord[1]+o))
-            break
-        else:
-            break
-    # SW
-    for o in list(range(1,min(7-coord[0],coord[1])+1)):
-        if state[coord[0]+o,coord[1]-o]==0:
-            moves.append((coord[0]+o,coord[1]-o))
-        elif state[coord]//7!=state[coord[0]+o,coord[1]-o]//7:
-            moves.append((coord[0]+o,coord[1]-o))
-            break
-        else:
-            break
-    # SE
-    for o in list(range(1,min(7-coord[0],7-coord[1])+1)):
-        if state[coord[0]+o,coord[1]+o]==0:
-            moves.append((coord[0]+o,coord[1]+o))
-        elif state[coord]//7!=state[coord[0]+o,coord[1]+o]//7:
-            moves.append((coord[0]+o,coord[1]+o))
-            break
-        else:
-            break
+    for t in PAWN_CAPTURE_COORDS[up][coord[0]*8+coord[1]]:
+        if state[t]!=0:
+            if state[coord]//7!=state[t]//7:
+                moves.append(t)
+        elif ep is not None and (coord[0],t[1])==tuple(ep):
+            # en passant
+            moves.append(t)
     return moves
 
 def getValidPositions(coord, state, orientation, ep=None, castle=None):
@@ -114,10 +98,7 @@ def getValidPositions(coord, state, orientation, ep=None, castle=None):
                 else:
                     break
             # NW & NE
-            if (coord[0]>0 and coord[1]>0) and ((state[coord]//7!=state[coord[0]-1,coord[1]-1]//7 and state[coord[0]-1,coord[1]-1]!=0) or (state[coord[0]-1,coord[1]-1]==0 and (coord[0],coord[1]-1)==ep)):
-                moves.append((coord[0]-1,coord[1]-1))
-            if (coord[0]>0 and coord[1]<7) and ((state[coord]//7!=state[coord[0]-1,coord[1]+1]//7 and state[coord[0]-1,coord[1]+1]!=0) or (state[coord[0]-1,coord[1]+1]==0 and (coord[0],coord[1]+1)==ep)):
-                moves.append((coord[0]-1,coord[1]+1))
+            moves.extend(getValidPawnCaptures(coord, state, 1, ep))
         else:
             # S
             for j in range(coord[0]+1,min(coord[0]+(3 if coord[0]==1 else 2),8)):
@@ -126,10 +107,7 @@ def getValidPositions(coord, state, orientation, ep=None, castle=None):
                 else:
                     break
             # SW & SE
-            if (coord[0]<7 and coord[1]>0) and ((state[coord]//7!=state[coord[0]+1,coord[1]-1]//7 and state[coord[0]+1,coord[1]-1]!=0) or (state[coord[0]+1,coord[1]-1]==0 and (coord[0],coord[1]-1)==ep)):
-                moves.append((coord[0]+1,coord[1]-1))
-            if (coord[0]<7 and coord[1]<7) and ((state[coord]//7!=state[coord[0]+1,coord[1]+1]//7 and state[coord[0]+1,coord[1]+1]!=0) or (state[coord[0]+1,coord[1]+1]==0 and (coord[0],coord[1]+1)==ep)):
-                moves.append((coord[0]+1,coord[1]+1))
+            moves.extend(getValidPawnCaptures(coord, state, 0, ep))
         return moves
     elif state[coord]==2 or state[coord]==8:
         # rook logic
@@ -137,11 +115,9 @@ def getValidPositions(coord, state, orientation, ep=None, castle=None):
         moves.extend(getValidPositionsVertical(coord, state))
     elif state[coord]==3 or state[coord]==9:
         # knight logic
-        for i in [-2,-1,1,2]:
-            ji = (1 if abs(i)==2 else 2)
-            for j in [ji, -1*ji]:
-                if 0<=coord[0]+i<=7 and 0<=coord[1]+j<=7 and (state[coord]//7!=state[coord[0]+i,coord[1]+j]//7 or state[coord[0]+i,coord[1]+j]==0):
-                    moves.append((coord[0]+i,coord[1]+j))
+        for t in KNIGHT_COORDS[coord[0]*8+coord[1]]:
+            if state[coord]//7!=state[t]//7 or state[t]==0:
+                moves.append(t)
     elif state[coord]==4 or state[coord]==10:
         # bishop logic
         moves.extend(getValidPositionsDiagonal(coord, state))
@@ -152,11 +128,9 @@ def getValidPositions(coord, state, orientation, ep=None, castle=None):
         moves.extend(getValidPositionsVertical(coord, state))    
     else:
         # king logic
-        for ox in [-1,0,1]:
-            for oy in [-1,0,1]:
-                if not(ox==0 and oy==0):
-                    if 0<=coord[0]+ox<=7 and 0<=coord[1]+oy<=7 and (state[coord]//7!=state[coord[0]+ox,coord[1]+oy]//7 or state[coord[0]+ox,coord[1]+oy]==0):
-                        moves.append((coord[0]+ox,coord[1]+oy))
+        for t in KING_COORDS[coord[0]*8+coord[1]]:
+            if state[coord]//7!=state[t]//7 or state[t]==0:
+                moves.append(t)
         # now also check whether castling is allowed
         if castle is not None:
             if coord[0]==0 or coord[0]==7:
@@ -170,29 +144,59 @@ def getValidPositions(coord, state, orientation, ep=None, castle=None):
                         moves.append((coord[0],coord[1]+2))
     return moves
 
+def isSquareAttacked(coord, state, attacker, orientation):
+    return _isSquareAttacked(coord[0]*8+coord[1], state.ravel().tolist(), (0 if attacker=="black" else 1), attacker==orientation)
+
+def _isSquareAttacked(sq, board, attacker, up):
+    """
+    Look outwards from sq along the component patterns and stop at the first attacker.
+
+    Arguments:
+        sq : square index (row*8+col) of interest
+        board : flattened state as list
+        attacker : color index (0=black, 1=white) of the attacking side
+        up : whether pawns of the attacker move towards row 0
+    Return:
+        attacked : whether sq is attacked by attacker
+    """
+    o = 6*attacker
+    # pawns which attack sq are located one row behind it (from the attacker's point of view)
+    for r, c in PAWN_CAPTURE_COORDS[0 if up else 1][sq]:
+        if board[r*8+c]==o+1:
+            return True
+    for r, c in KNIGHT_COORDS[sq]:
+        if board[r*8+c]==o+3:
+            return True
+    for r, c in KING_COORDS[sq]:
+        if board[r*8+c]==o+6:
+            return True
+    # sliding components: first component along each ray
+    for d in (N, S, E, W, NE, NW, SE, SW):
+        for r, c in RAY_COORDS[d][sq]:
+            p = board[r*8+c]
+            if p!=0:
+                if p==o+5 or p==(o+2 if d<4 else o+4):
+                    return True
+                break
+    return False
+
 def isAttacked(pos, state, attacker, orientation):
-    attacked = False
-    for i in range(8):
-        for j in range(8):
-            # check if we have a component of the attacker
-            if state[i,j]//7==(0 if attacker=="black" else 1) and state[i,j]!=0:
-                # check if the current component attacks any of the positions in pos
-                att_pos = getValidPositions((i,j), state, orientation, None, None)
-                for p in pos:
-                    if p in att_pos:
-                        attacked=True
-                        break
-                if attacked:
-                    break
-        if attacked:
-            break
-    return attacked
+    # batched variant of isSquareAttacked: state is flattened once for all positions in pos
+    board = state.ravel().tolist()
+    a = (0 if attacker=="black" else 1)
+    for p in pos:
+        if _isSquareAttacked(p[0]*8+p[1], board, a, attacker==orientation):
+            return True
+    return False
 
 def isCheck(coord, new_coord, state, orientation):
     # create snapshot of state after new move
     new_state = np.copy(state) 
     new_state[new_coord] = state[coord]
     new_state[coord] = 0
+    if state[coord] in [1,7] and state[new_coord]==0 and new_coord[1]!=coord[1]:
+        # en passant also removes the captured pawn
+        new_state[coord[0],new_coord[1]] = 0
     # find position of king
     pos_king = [c[0] for c in np.where(new_state==6*((state[coord]//7)+1))]
     # check if attacked
@@ -207,26 +211,79 @@ def getComponents(color, state):
     return components
 
 def isChecked(color, state, orientation, ep, castle):
-    # get position of color's king
-    pos_king = [c[0] for c in np.where(state==(6 if color=="black" else 12))]
-    # check if this position is attacked
-    check = isAttacked([tuple(pos_king)], state, ("white" if color=="black" else "black"), orientation)
-    return check
+    return getStatus(color, state, orientation, ep, castle).checked
 
 def isStalemated(color, state, orientation, ep, castle):
-    stalemate = True
-    # get components and shuffle
-    comps = getComponents(color, state)
-    # run over components
-    for c in comps:
-        # get valid positions 
-        c_pos = getValidPositions(c, state, orientation, ep, castle)
-        # do we have options?
-        if len(c_pos) > 0:
-            for p in c_pos:
-                if not isCheck(c, p, state, orientation):
-                    stalemate = False
-                    break
-        if not stalemate:
-            break
-    return stalemate
+    # no legal moves for color
+    return len(getStatus(color, state, orientation, ep, castle).moves) == 0
+
+def applyMove(coord, new_coord, state, ep, castle, poption=None):
+    """
+    Important: arguments that are going to be modified: state, castle
+
+    Arguments:
+        coord : component of move to be applied
+        new_coord : new position of component
+        state : the (current, ie, before new move) state of game
+        ep : current (ie, before new move) state for en-passant
+        castle : current (ie, before new move) state for castling
+        poption : promotion option (0=bishop, 1=knight, 2=rook, 3=queen) in case of pawn promotion
+    Return:
+        ep : new ep state of game after applied move
+        captured : captured component (0 if none)
+    """
+    captured = 0
+    # checks for double pawn or en passant
+    if new_coord[1]==coord[1] and abs(new_coord[0]-coord[0])==2 and state[coord] in [1,7]:
+        new_ep = list(new_coord)
+    elif state[coord] in [1,7] and state[new_coord]==0 and new_coord[0]!=coord[0] and new_coord[1]!=coord[1] and ep is not None:
+        # en passant move
+        captured = state[coord[0],new_coord[1]]
+        state[coord[0],new_coord[1]] = 0
+        new_ep = None
+    else:
+        new_ep = None
+    # check whether we have a rook or king move
+    if state[coord] in [2,8]:
+        if coord==(0,0):
+            castle[0]=True
+        elif coord==(0,7):
+            castle[2]=True
+        elif coord==(7,0):
+            castle[3]=True
+        elif coord==(7,7):
+            castle[5]=True
+    if state[coord] in [6,12]:
+        if (coord==(0,4) and state[coord]==6) or (coord==(0,3) and state[coord]==12):
+            castle[1]=True
+        elif (coord==(7,3) and state[coord]==6) or (coord==(7,4) and state[coord]==12):
+            castle[4]=True
+        # check if castled -> change rooks
+        if abs(coord[1]-new_coord[1])==2:
+            # check if W or E
+            if coord[1]<new_coord[1]:
+                state[new_coord[0],new_coord[1]-1] = state[coord[0],7]
+                state[coord[0],7] = 0
+            else:
+                state[new_coord[0],new_coord[1]+1] = state[coord[0],0]
+                state[coord[0],0] = 0
+    # check if piece is captured
+    if state[new_coord] != 0:
+        captured = state[new_coord]
+        # a captured rook can no longer castle
+        if new_coord==(0,0):
+            castle[0]=True
+        elif new_coord==(0,7):
+            castle[2]=True
+        elif new_coord==(7,0):
+            castle[3]=True
+        elif new_coord==(7,7):
+            castle[5]=True
+    # check for pawn promotion
+    if poption is not None and state[coord] in [1,7] and (new_coord[0]==0 or new_coord[0]==7):
+        state[new_coord] = [4,3,2,5][poption]+((state[coord]//7)*6)
+    else:
+        state[new_coord] = state[coord]
+    state[coord] = 0
+    return new_ep, int(captured)
+
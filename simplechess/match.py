@@ -0,0 +1,238 @@
+"""
+File containing code for headless engine-vs-engine matches.
+Author: Thomas Mortier
+Date: October 2026
+
+Games are played in parallel by a pool of worker processes. Each opening of
+the suite is played twice, with colours swapped, and the result is reported
+as W/D/L of the first engine together with the Elo difference (95% interval).
+
+Usage:
+    python -m simplechess.match -e1 abp:3 -e2 random -n 100 -j 4
+    python -m simplechess.match -e1 abp:4 -e2 abp:3 --movetime 0.5 --openings openings.txt
+    python -m simplechess.match -e1 abp:5 -e2 abp:5:nonull:nolmr
+"""
+import sys
+import os
+import argparse
+import math
+import time
+import multiprocessing
+
+from simplechess.bitboard import Position, WHITE, BLACK, toCoord, toSquare
+from simplechess.engine import RandomEngine, ABPEngine
+from simplechess.fen import STARTPOS, parseFen, fromUci
+
+# opening suite, as moves from the start position
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6 f1b5",
+    "e2e4 e7e5 g1f3 b8c6 f1c4",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d5 e4d5 d8d5",
+    "e2e4 d7d6 d2d4 g8f6 b1c3",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 g7g6 b1c3",
+    "d2d4 g8f6 c2c4 e7e6 b1c3 f8b4",
+    "d2d4 f7f5 g2g3",
+    "c2c4 e7e5 b1c3",
+    "g1f3 d7d5 g2g3",
+    "b2b3 e7e5 c1b2"]
+
+# options of the abp engine which switch off a selective search feature or quiescence search (leaf
+# nodes are then scored by the full evaluation, incl. mobility and king safety)
+ABP_OPTIONS = {"nonull": "nullmove", "nolmr": "lmr", "nofutility": "futility", "noqs": "quiescence"}
+
+# draw adjudication
+FIFTY_MOVES = 100
+REPETITIONS = 3
+
+def parseEngine(spec):
+    """
+    Arguments:
+        spec : engine specification, ie, "random" or "abp:DEPTH[:OPTION...]" with options nonull, nolmr, nofutility and noqs
+    Return:
+        name : engine class name
+        depth : maximum search depth (None for random engine)
+        options : dict of keyword arguments for the engine
+    """
+    fields = spec.split(":")
+    if fields[0] == "random" and len(fields) == 1:
+        return "random", None, {}
+    if fields[0] == "abp" and len(fields) >= 2 and fields[1].isdigit() and int(fields[1]) > 0 and all(f in ABP_OPTIONS for f in fields[2:]):
+        return "abp", int(fields[1]), {ABP_OPTIONS[f]: False for f in fields[2:]}
+    raise ValueError("Invalid engine specification {0}!".format(spec))
+
+def createEngine(spec, color, orientation, hash_size, seed):
+    name, depth, options = parseEngine(spec)
+    if name == "random":
+        return RandomEngine(color, orientation, seed=seed)
+    return ABPEngine(color, orientation, depth, hash_size, seed=seed, **options)
+
+def startPosition(opening, orientation="white"):
+    """
+    Arguments:
+        opening : FEN or space separated moves (eg, "e2e4 e7e5") from the start position
+        orientation : orientation of the game
+    Return:
+        position : bitboard position after the opening
+    """
+    fen, moves = (opening, []) if "/" in opening else (STARTPOS, opening.split())
+    state, ep, castle, color = parseFen(fen, orientation)
+    position = Position.fromState(state, orientation, ep, castle, color)
+    for name in moves:
+        move = fromUci(name, orientation)
+        if move not in position.legalMoves(promotions=(0, 1, 2, 3)):
+            raise ValueError("Illegal move {0} in opening {1}!".format(name, opening))
+        position.makeMove(move)
+    return position
+
+def loadOpenings(path):
+    # one opening (FEN or moves) per line, empty lines and lines starting with # are skipped
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def isInsufficientMaterial(position):
+    # only kings, possibly with a single bishop or knight
+    heavy = sum(position.bb[6*c+t] for c in (BLACK, WHITE) for t in (1, 2, 5))
+    minors = sum(position.counts[6*c+t] for c in (BLACK, WHITE) for t in (3, 4))
+    return heavy == 0 and minors <= 1
+
+def playGame(task):
+    """
+    Arguments:
+        task : (opening, spec white, spec black, move time, max. plies, hash size, seed)-tuple
+    Return:
+        result : 1 (white wins), 0.5 (draw) or 0 (black wins)
+        reason : reason for the end of the game
+        stats : [nodes, time, moves]-list per color (index: BLACK, WHITE)
+    """
+    opening, spec_white, spec_black, movetime, maxplies, hash_size, seed = task
+    orientation = "white"
+    position = startPosition(opening, orientation)
+    engines = [createEngine(spec_black, "black", orientation, hash_size, seed),
+               createEngine(spec_white, "white", orientation, hash_size, (None if seed is None else seed+1))]
+    stats = [[0, 0.0, 0], [0, 0.0, 0]]
+    repetitions = {position.key: 1}
+    halfmoves = 0
+    for _ in range(maxplies):
+        color = position.color
+        moves = position.legalMoves(promotions=(0, 1, 2, 3))
+        if len(moves) == 0:
+            if position.isChecked(color):
+                return (0 if color == WHITE else 1), "checkmate", stats
+            return 0.5, "stalemate", stats
+        if halfmoves >= FIFTY_MOVES:
+            return 0.5, "fifty moves", stats
+        if isInsufficientMaterial(position):
+            return 0.5, "insufficient material", stats
+        engine = engines[color]
+        start = time.time()
+        ep = (list(toCoord(position.ep)) if position.ep is not None else None)
+        comp, pos = engine.getMove(position.toState(), position.score, ep, position.castle, movetime)
+        stats[color][0] += getattr(engine, "nodes", 0)
+        stats[color][1] += time.time()-start
+        stats[color][2] += 1
+        frm, to = toSquare(comp), toSquare(pos)
+        po = None
+        if position.board[frm] % 6 == 1 and to >> 3 in (0, 7):
+            po = engine.getPromotion()
+        move = (frm, to, po)
+        if move not in moves:
+            # an illegal move loses the game
+            return (0 if color == WHITE else 1), "illegal move", stats
+        halfmoves = (0 if position.board[frm] % 6 == 1 or position.capturePoints(move) > 0 else halfmoves+1)
+        position.makeMove(move)
+        repetitions[position.key] = repetitions.get(position.key, 0)+1
+        if repetitions[position.key] >= REPETITIONS:
+            return 0.5, "repetition", stats
+    return 0.5, "max. plies", stats
+
+def eloDifference(wins, draws, losses):
+    """
+    Arguments:
+        wins, draws, losses : results of the first engine
+    Return:
+        elo : Elo difference of the first engine w.r.t. the second engine
+        margin : half width of the 95% interval of elo
+    """
+    n = wins+draws+losses
+    if n == 0:
+        return 0.0, math.inf
+    def elo(p):
+        if p <= 0:
+            return -math.inf
+        if p >= 1:
+            return math.inf
+        return -400*math.log10(1/p-1)
+    p = (wins+0.5*draws)/n
+    # standard error of the mean score per game
+    var = (wins*(1-p)**2+draws*(0.5-p)**2+losses*p**2)/n
+    se = math.sqrt(var/n)
+    lower, upper = elo(p-1.96*se), elo(p+1.96*se)
+    if math.isinf(lower) or math.isinf(upper):
+        return elo(p), math.inf
+    return elo(p), (upper-lower)/2
+
+def runMatch(spec1, spec2, games, jobs, openings, movetime=None, maxplies=300, hash_size=16, seed=None, out=sys.stdout):
+    """
+    Play games between two engines, alternating colours for each opening.
+
+    Return:
+        wins, draws, losses : results of the first engine
+    """
+    tasks = []
+    for i in range(games):
+        opening = openings[(i//2) % len(openings)]
+        spec_white, spec_black = (spec1, spec2) if i % 2 == 0 else (spec2, spec1)
+        tasks.append((opening, spec_white, spec_black, movetime, maxplies, hash_size, (None if seed is None else seed+2*i)))
+    wins, draws, losses = 0, 0, 0
+    reasons = {}
+    # nodes, time, moves per engine
+    totals = [[0, 0.0, 0], [0, 0.0, 0]]
+    start = time.time()
+    with multiprocessing.Pool(jobs) as pool:
+        for i, (result, reason, stats) in enumerate(pool.imap(playGame, tasks)):
+            # convert to the perspective of the first engine
+            first = (WHITE if i % 2 == 0 else BLACK)
+            score = (result if first == WHITE else 1-result)
+            wins, draws, losses = wins+(score == 1), draws+(score == 0.5), losses+(score == 0)
+            reasons[reason] = reasons.get(reason, 0)+1
+            for j, c in enumerate((first, 1-first)):
+                totals[j] = [totals[j][k]+stats[c][k] for k in range(3)]
+            out.write("game {0}/{1}: {2} ({3}), {4}-{5}-{6}\n".format(i+1, games, {1: "1-0", 0.5: "1/2-1/2", 0: "0-1"}[result], reason, wins, draws, losses))
+            out.flush()
+    elapsed = time.time()-start
+    elo, margin = eloDifference(wins, draws, losses)
+    out.write("\n{0} vs {1}: {2} games in {3:.1f} sec.\n".format(spec1, spec2, games, elapsed))
+    out.write("W/D/L: {0}/{1}/{2}, score: {3:.1f}%\n".format(wins, draws, losses, 100*(wins+0.5*draws)/max(games, 1)))
+    out.write("Elo difference: {0:+.1f} +/- {1:.1f}\n".format(elo, margin))
+    out.write("end of games: {0}\n".format(", ".join("{0} {1}".format(k, v) for k, v in sorted(reasons.items()))))
+    for spec, (nodes, t, moves) in zip((spec1, spec2), totals):
+        out.write("{0}: {1:.0f} nodes/sec, {2:.3f} sec./move\n".format(spec, nodes/max(t, 1e-9), t/max(moves, 1)))
+    return wins, draws, losses
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Simple Chess match")
+    parser.add_argument("-e1", "--engine1", dest="engine1", default="abp:2")
+    parser.add_argument("-e2", "--engine2", dest="engine2", default="random")
+    parser.add_argument("-n", "--games", dest="games", type=int, default=100)
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--movetime", dest="movetime", type=float, default=None)
+    parser.add_argument("--maxplies", dest="maxplies", type=int, default=300)
+    parser.add_argument("--hash", dest="hash", type=int, default=16)
+    parser.add_argument("--openings", dest="openings", default=None)
+    parser.add_argument("--seed", dest="seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        parseEngine(args.engine1)
+        parseEngine(args.engine2)
+        openings = (loadOpenings(args.openings) if args.openings is not None else OPENINGS)
+        for opening in openings:
+            startPosition(opening)
+    except ValueError as e:
+        parser.error(str(e))
+    runMatch(args.engine1, args.engine2, args.games, args.jobs, openings, args.movetime, args.maxplies, args.hash, args.seed)
@@ -0,0 +1,192 @@
+"""
+File containing code for perft, ie, counting the leaf nodes of the legal move tree, which is
+used as a correctness and speed benchmark for move generation.
+Author: Thomas Mortier
+Date: October 2026
+
+Usage:
+    python -m simplechess.perft [-d DEPTH] [-b {logic,bitboard}] [-o {white,black,both}]
+    python -m simplechess.perft --fen FEN --divide -d DEPTH
+"""
+import sys
+import argparse
+import time
+
+import numpy as np
+
+from simplechess.logic import getComponents, getValidPositions, isCheck, applyMove
+from simplechess.bitboard import Position
+from simplechess.fen import STARTPOS, parseFen, toAlgebraic, toUci
+
+# test positions together with known node counts per depth
+POSITIONS = [
+    ("startpos", STARTPOS,
+        {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("discovered", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+    ("illegal-ep-1", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1",
+        {1: 18, 2: 92, 3: 1670, 6: 1134888}),
+    ("illegal-ep-2", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1",
+        {1: 13, 2: 102, 3: 1266, 6: 1015133}),
+    ("ep-check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1",
+        {1: 15, 2: 126, 3: 1928, 6: 1440467}),
+    ("short-castle-check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1",
+        {1: 15, 2: 66, 3: 1198, 6: 661072}),
+    ("long-castle-check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1",
+        {1: 16, 2: 71, 3: 1286, 6: 803711}),
+    ("castle-rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1",
+        {1: 26, 2: 1141, 3: 27826, 4: 1274206}),
+    ("castle-prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1",
+        {1: 44, 2: 1494, 3: 50509, 4: 1720476}),
+    ("promote-out-of-check", "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1",
+        {1: 11, 2: 133, 3: 1442, 6: 3821001}),
+    ("discovered-check", "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1",
+        {1: 29, 2: 165, 3: 5160, 5: 1004658}),
+    ("promote-check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1",
+        {1: 9, 2: 40, 3: 472, 6: 217342}),
+    ("underpromote-check", "8/P1k5/K7/8/8/8/8/8 w - - 0 1",
+        {1: 6, 2: 27, 3: 273, 6: 92683}),
+    ("self-stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1",
+        {1: 2, 2: 6, 3: 13, 6: 2217}),
+    ("stalemate-checkmate-1", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1",
+        {1: 10, 2: 25, 3: 268, 7: 567584}),
+    ("stalemate-checkmate-2", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1",
+        {1: 37, 2: 183, 3: 6559, 4: 23527})]
+
+def getStateMoves(state, orientation, ep, castle, color):
+    # legal moves according to the rules in logic.py, as (coord, new_coord, poption)-tuples
+    moves = []
+    for c in getComponents(color, state):
+        for p in getValidPositions(c, state, orientation, ep, castle):
+            if not isCheck(c, p, state, orientation):
+                if state[c] in [1,7] and (p[0]==0 or p[0]==7):
+                    moves.extend([(c, p, po) for po in range(4)])
+                else:
+                    moves.append((c, p, None))
+    return moves
+
+def perftState(state, orientation, ep, castle, color, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for c, p, po in getStateMoves(state, orientation, ep, castle, color):
+        new_state, new_castle = np.copy(state), castle.copy()
+        new_ep, _ = applyMove(c, p, new_state, ep, new_castle, po)
+        nodes += perftState(new_state, orientation, new_ep, new_castle, ("white" if color=="black" else "black"), depth-1)
+    return nodes
+
+def perftPosition(position, depth):
+    if depth == 0:
+        return 1
+    moves = position.legalMoves(promotions=(0, 1, 2, 3))
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for m in moves:
+        undo = position.makeMove(m)
+        nodes += perftPosition(position, depth-1)
+        position.unmakeMove(m, undo)
+    return nodes
+
+def divide(depth, fen=STARTPOS, orientation="white", backend="logic"):
+    """
+    Arguments:
+        depth : depth of move tree (>0)
+        fen : FEN of root position
+        orientation : orientation of the game
+        backend : "logic" (numpy state and logic.py) or "bitboard" (Position)
+    Return:
+        counts : dict mapping each legal root move (eg, "e2e4" or "e7e8q") to its number of leaf nodes
+    """
+    state, ep, castle, color = parseFen(fen, orientation)
+    counts = {}
+    if backend == "logic":
+        for c, p, po in getStateMoves(state, orientation, ep, castle, color):
+            new_state, new_castle = np.copy(state), castle.copy()
+            new_ep, _ = applyMove(c, p, new_state, ep, new_castle, po)
+            name = toAlgebraic(c, orientation)+toAlgebraic(p, orientation)+("" if po is None else "bnrq"[po])
+            counts[name] = perftState(new_state, orientation, new_ep, new_castle, ("white" if color=="black" else "black"), depth-1)
+    elif backend == "bitboard":
+        position = Position.fromState(state, orientation, ep, castle, color)
+        for m in position.legalMoves(promotions=(0, 1, 2, 3)):
+            undo = position.makeMove(m)
+            counts[toUci(m, orientation)] = perftPosition(position, depth-1)
+            position.unmakeMove(m, undo)
+    else:
+        raise ValueError("Unknown backend {0}!".format(backend))
+    return counts
+
+def perft(depth, fen=STARTPOS, orientation="white", backend="logic"):
+    """
+    Arguments:
+        depth : depth of move tree
+        fen : FEN of root position
+        orientation : orientation of the game
+        backend : "logic" (numpy state and logic.py) or "bitboard" (Position)
+    Return:
+        nodes : number of leaf nodes
+    """
+    if depth == 0:
+        return 1
+    return sum(divide(depth, fen, orientation, backend).values())
+
+def runSuite(depth, backend, orientations, names=None, out=sys.stdout):
+    """
+    Run perft on all test positions for which a known node count up to depth is available.
+
+    Return:
+        failures : number of node counts which differ from the known values
+    """
+    failures, total_nodes, total_time = 0, 0, 0.0
+    out.write("{0:<24}{1:<7}{2:>6}{3:>12}{4:>12}{5:>10}{6:>12}  {7}\n".format("position", "side", "depth", "nodes", "expected", "time", "nodes/sec", "result"))
+    for name, fen, known in POSITIONS:
+        if names is not None and name not in names:
+            continue
+        depths = [d for d in sorted(known) if d <= depth]
+        if len(depths) == 0:
+            continue
+        d = depths[-1]
+        for orientation in orientations:
+            start = time.time()
+            nodes = perft(d, fen, orientation, backend)
+            elapsed = time.time()-start
+            ok = nodes == known[d]
+            failures += (0 if ok else 1)
+            total_nodes += nodes
+            total_time += elapsed
+            out.write("{0:<24}{1:<7}{2:>6}{3:>12}{4:>12}{5:>10.2f}{6:>12.0f}  {7}\n".format(name, orientation, d, nodes, known[d], elapsed, nodes/max(elapsed, 1e-9), ("ok" if ok else "FAIL")))
+            out.flush()
+    out.write("total: {0} nodes in {1:.2f} sec. ({2:.0f} nodes/sec), {3} failure(s)\n".format(total_nodes, total_time, total_nodes/max(total_time, 1e-9), failures))
+    return failures
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Simple Chess perft")
+    parser.add_argument("-d", "--depth", dest="depth", type=int, default=3)
+    parser.add_argument("-b", "--backend", dest="backend", default="logic", choices=["logic", "bitboard"])
+    parser.add_argument("-o", "--orientation", dest="orientation", default="both", choices=["white", "black", "both"])
+    parser.add_argument("-p", "--position", dest="positions", action="append", choices=[p[0] for p in POSITIONS])
+    parser.add_argument("--fen", dest="fen", default=None)
+    parser.add_argument("--divide", dest="divide", action="store_true")
+    args = parser.parse_args()
+    orientations = (["white", "black"] if args.orientation == "both" else [args.orientation])
+    if args.fen is not None or args.divide:
+        fen = (args.fen if args.fen is not None else STARTPOS)
+        for orientation in orientations:
+            start = time.time()
+            counts = divide(args.depth, fen, orientation, args.backend)
+            elapsed = time.time()-start
+            if args.divide:
+                for move in sorted(counts):
+                    print("{0}: {1}".format(move, counts[move]))
+            nodes = sum(counts.values())
+            print("{0}: {1} nodes in {2:.2f} sec. ({3:.0f} nodes/sec)".format(orientation, nodes, elapsed, nodes/max(elapsed, 1e-9)))
+    else:
+        sys.exit(1 if runSuite(args.depth, args.backend, orientations, args.positions) > 0 else 0)
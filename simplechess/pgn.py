@@ -0,0 +1,105 @@
+"""
+File containing code for reading games in PGN (Portable Game Notation).
+Author: Thomas Mortier
+Date: October 2026
+
+Games are read lazily, one at a time, and their moves (in SAN) are converted
+to (from, to, promotion)-moves of the bitboard backend. Comments, variations
+and NAGs are skipped.
+"""
+import re
+
+from simplechess.bitboard import Position
+from simplechess.fen import STARTPOS, parseFen, toAlgebraic, fromAlgebraic
+
+RESULTS = {"1-0": 1, "0-1": 0, "1/2-1/2": 0.5, "*": None}
+
+SAN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+# component type (index: (component-1)%6) of SAN piece letters
+SAN_TYPES = {"": 0, "R": 1, "N": 2, "B": 3, "Q": 4, "K": 5}
+SAN_PROMOTIONS = {"B": 0, "N": 1, "R": 2, "Q": 3}
+TOKENS = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|[^\s(){};]+")
+
+def parseSan(position, san):
+    """
+    Arguments:
+        position : bitboard position of game
+        san : move in standard algebraic notation, eg, "Nbd7", "exd5", "O-O" or "e8=Q+"
+    Return:
+        move : legal (from, to, promotion)-move
+    """
+    name = san.rstrip("+#!?")
+    legal = position.legalMoves(promotions=(0, 1, 2, 3))
+    if name in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        # castling: king moves two squares, towards the h-file for the short side
+        short = name in ("O-O", "0-0")
+        for m in legal:
+            if (position.board[m[0]]-1) % 6 == 5 and abs(m[1]-m[0]) == 2:
+                kingside = (m[1] > m[0]) == (position.orientation == "white")
+                if kingside == short:
+                    return m
+        raise ValueError("Illegal move {0}!".format(san))
+    match = SAN.match(name)
+    if match is None:
+        raise ValueError("Invalid move {0}!".format(san))
+    piece, file, rank, target, promotion = match.groups()
+    t = SAN_TYPES[piece or ""]
+    to = fromAlgebraic(target, position.orientation)
+    to = to[0]*8+to[1]
+    po = (SAN_PROMOTIONS[promotion] if promotion else None)
+    candidates = []
+    for m in legal:
+        if m[1] != to or m[2] != po or (position.board[m[0]]-1) % 6 != t:
+            continue
+        # disambiguation by file and/or rank of the origin
+        square = toAlgebraic(divmod(m[0], 8), position.orientation)
+        if (file is None or square[0] == file) and (rank is None or square[1] == rank):
+            candidates.append(m)
+    if len(candidates) != 1:
+        raise ValueError("{0} move {1}!".format(("Illegal" if len(candidates) == 0 else "Ambiguous"), san))
+    return candidates[0]
+
+def readGames(stream):
+    """
+    Arguments:
+        stream : text stream with games in PGN
+    Return:
+        games : generator of (tags, moves in SAN, result)-tuples, with result 1 (white wins), 0.5, 0 or None
+    """
+    tags, text = {}, []
+    for line in stream:
+        line = line.strip()
+        if line.startswith("[") and line.endswith("]"):
+            if text:
+                yield _parseGame(tags, " ".join(text))
+                tags, text = {}, []
+            fields = line[1:-1].split(None, 1)
+            if len(fields) == 2:
+                tags[fields[0]] = fields[1].strip('"')
+        elif line and not line.startswith("%"):
+            text.append(line)
+    if text:
+        yield _parseGame(tags, " ".join(text))
+
+def _parseGame(tags, text):
+    moves, result, depth = [], RESULTS.get(tags.get("Result", "*")), 0
+    for token in TOKENS.findall(text):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth-1, 0)
+        elif depth > 0 or token[0] in "{;$":
+            continue
+        elif token in RESULTS:
+            result = RESULTS[token]
+        else:
+            # strip move numbers, eg, "12." or "12...e5"
+            token = token.split(".")[-1]
+            if token:
+                moves.append(token)
+    return tags, moves, result
+
+def startPosition(tags, orientation="white"):
+    # start position of a game, given by its FEN tag (if any)
+    state, ep, castle, color = parseFen(tags.get("FEN", STARTPOS), orientation)
+    return Position.fromState(state, orientation, ep, castle, color)
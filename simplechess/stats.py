@@ -0,0 +1,168 @@
+"""
+File containing code for search statistics.
+Author: Thomas Mortier
+Date: October 2026
+
+Profiling is opt-in: when enabled, methods of the engine and of the searched
+position are replaced (on the instances only) by wrappers which time and
+count the calls, hence, a search without profiling runs the original code.
+Time is attributed exclusively, ie, the time of legality checks done by the
+move generator is not counted as move generation.
+"""
+import json
+import time
+
+# phases of the search, anything not covered by the others is counted as "search"
+PHASES = ["movegen", "legality", "evaluation", "search"]
+# number of move indices for which beta cutoffs are reported separately
+CUTOFF_INDICES = 4
+
+class Profiler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = {phase: 0.0 for phase in PHASES}
+        self.leaves = 0
+        self.qnodes = 0
+        self.seldepth = 0
+        self.stack = ["search"]
+        self.mark = time.perf_counter()
+
+    def wrap(self, phase, fn):
+        """
+        Arguments:
+            phase : phase to which the time spent in fn is attributed
+            fn : (bound) function to time
+        Return:
+            timed : function with the same signature as fn
+        """
+        def timed(*args, **kwargs):
+            now = time.perf_counter()
+            self.times[self.stack[-1]] += now-self.mark
+            self.stack.append(phase)
+            self.mark = now
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                now = time.perf_counter()
+                self.times[self.stack.pop()] += now-self.mark
+                self.mark = now
+        return timed
+
+    def instrumentPosition(self, position):
+        # applies to position only, copies of position are not instrumented
+        position.generateMoves = self.wrap("movegen", position.generateMoves)
+        position.legalMoves = self.wrap("legality", position.legalMoves)
+        position.isChecked = self.wrap("legality", position.isChecked)
+        position.isStalemated = self.wrap("legality", position.isStalemated)
+        position.evaluate = self.wrap("evaluation", position.evaluate)
+        return position
+
+    def instrumentEngine(self, engine):
+        engine.getStates = self.wrap("movegen", engine.getStates)
+        engine.getChecks = self.wrap("movegen", engine.getChecks)
+        evaluateLeaf, evaluateChildren, quiesce = engine.evaluateLeaf, engine.evaluateChildren, engine.quiesce
+        def countLeaf(position):
+            self.leaves += 1
+            return evaluateLeaf(position)
+        def countChildren(position, moves, ply):
+            self.leaves += len(moves)
+            self.seldepth = max(self.seldepth, ply+1)
+            return evaluateChildren(position, moves, ply)
+        def countQuiesce(position, alpha, beta, ply, qply):
+            self.qnodes += 1
+            if qply == 0:
+                self.leaves += 1
+            self.seldepth = max(self.seldepth, ply)
+            return quiesce(position, alpha, beta, ply, qply)
+        engine.evaluateLeaf = self.wrap("evaluation", countLeaf)
+        engine.evaluateChildren = self.wrap("evaluation", countChildren)
+        engine.quiesce = countQuiesce
+
+    def stop(self):
+        # attribute the time since the last call to the current phase
+        now = time.perf_counter()
+        self.times[self.stack[-1]] += now-self.mark
+        self.mark = now
+
+class SearchStats:
+    def __init__(self, depth, nodes, elapsed, cutoffs, tt, tablebase_hits=0, profiler=None):
+        """
+        Arguments:
+            depth : depth of the last completed iteration
+            nodes : number of searched nodes (incl. quiescence nodes)
+            elapsed : duration (in sec.) of the search
+            cutoffs : beta cutoffs per index of the move which caused the cutoff
+            tt : probes, hits and stores of the transposition table during the search
+            tablebase_hits : number of positions resolved by the endgame tablebases
+            profiler : Profiler of the search (None if profiling was disabled)
+        """
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.nps = nodes/max(elapsed, 1e-9)
+        # cutoffs at move index 0, 1, ..., CUTOFF_INDICES-1 and beyond
+        self.cutoffs = cutoffs[:CUTOFF_INDICES]+[sum(cutoffs[CUTOFF_INDICES:])]
+        self.tt = tt
+        self.tt_hitrate = (tt["hits"]/tt["probes"] if tt["probes"] > 0 else 0.0)
+        self.tablebase_hits = tablebase_hits
+        self.profiled = profiler is not None
+        if self.profiled:
+            self.seldepth = profiler.seldepth
+            self.leaves = profiler.leaves
+            self.qnodes = profiler.qnodes
+            self.times = dict(profiler.times)
+
+    def firstCutoffRate(self):
+        total = sum(self.cutoffs)
+        return (self.cutoffs[0]/total if total > 0 else 0.0)
+
+    def toDict(self):
+        stats = {
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "elapsed": round(self.elapsed, 6),
+            "nps": int(self.nps),
+            "cutoffs": self.cutoffs,
+            "first_cutoff_rate": round(self.firstCutoffRate(), 4),
+            "tt_probes": self.tt["probes"],
+            "tt_hitrate": round(self.tt_hitrate, 4),
+            "tt_stores": self.tt["stores"],
+            "tablebase_hits": self.tablebase_hits}
+        if self.profiled:
+            stats.update({
+                "seldepth": self.seldepth,
+                "leaves": self.leaves,
+                "qnodes": self.qnodes,
+                "times": {phase: round(t, 6) for phase, t in self.times.items()}})
+        return stats
+
+    def format(self):
+        lines = ["depth {0}, {1} nodes in {2:.3f} sec. ({3:.0f} nodes/sec)".format(self.depth, self.nodes, self.elapsed, self.nps)]
+        if self.profiled:
+            lines.append("seldepth {0}, {1} leaves, {2} quiescence nodes".format(self.seldepth, self.leaves, self.qnodes))
+            total = max(sum(self.times.values()), 1e-9)
+            lines.append("time: "+", ".join("{0} {1:.1f}%".format(phase, 100*t/total) for phase, t in self.times.items()))
+        lines.append("cutoffs by move index: {0} (first move {1:.1f}%)".format(
+            " ".join(str(c) for c in self.cutoffs), 100*self.firstCutoffRate()))
+        lines.append("tt hit rate {0:.1f}% ({1} probes, {2} stores), tablebase hits {3}".format(100*self.tt_hitrate, self.tt["probes"], self.tt["stores"], self.tablebase_hits))
+        return "\n".join(lines)
+
+class JsonLinesSink:
+    def __init__(self, path):
+        """
+        Arguments:
+            path : file to which one JSON object per record is appended
+        """
+        self.file = open(path, "a")
+
+    def write(self, stats, **fields):
+        # stats (SearchStats) together with extra fields, eg, the move played
+        record = dict(fields)
+        record.update(stats.toDict())
+        self.file.write(json.dumps(record)+"\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,437 @@
+"""
+File containing code for endgame tablebases.
+Author: Thomas Mortier
+Date: October 2026
+
+Tables are generated by retrograde analysis for material with at most four
+components (eg, KQvK, KRvK, KPvK and KBNvK) and store the distance to mate
+(in plies) of every position, for both players to move. A table is a flat
+file of one byte per position (0 for draws and invalid positions, otherwise
+distance to mate plus one, where an odd distance is a win for the player to
+move), indexed by the player to move and the squares of the components, in
+orientation white. Tables are memory mapped when probed.
+
+The first side of a table name is the stronger one, positions with colours
+swapped are probed by mirroring the board. Castling and en passant are not
+considered (tables with pawns for both sides are not supported) and neither
+is the fifty-move rule.
+
+Usage:
+    python -m simplechess.tablebase generate -o tables KQvK KRvK KPvK KBNvK
+    python -m simplechess.tablebase probe tables --fen "8/8/8/4k3/8/8/8/4KQ2 w - - 0 1"
+"""
+import sys
+import os
+import glob
+import mmap
+import time
+import functools
+import argparse
+import numpy as np
+
+from simplechess.bitboard import Position, WHITE, BLACK, CORNERS, iterBits
+from simplechess.tables import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS, BETWEEN, ORTHOGONAL, DIAGONAL
+
+MAX_COMPONENTS = 4
+EXTENSION = ".tb"
+DEFAULT_TABLES = ["KQvK", "KRvK", "KPvK", "KBNvK"]
+
+# component type (index: (component-1)%6) of table name letters, in order of the names
+LETTERS = "KQRBNP"
+LETTER_TYPES = {"P": 0, "R": 1, "N": 2, "B": 3, "Q": 4, "K": 5}
+TYPE_LETTERS = "PRNBQK"
+VALUES = [1, 5, 3, 3, 9, 0]
+# component types a pawn may promote to
+PROMOTION_TYPES = [4, 1, 3, 2]
+
+# values during generation (negamax, from the perspective of the player to move): win (loss) in
+# d plies is WIN-d (-(WIN-d)), draws and unresolved positions are 0
+WIN = 1000
+ILLEGAL = 2000
+NONE = -3000
+
+# squares mirrored top-down, which swaps the colours of a position in orientation white
+FLIP = np.array([sq ^ 56 for sq in range(64)])
+
+def _bits(bb):
+    return np.array([(bb >> sq) & 1 for sq in range(64)], dtype=bool)
+
+def _attackMatrix(p):
+    # (from, to) attacks of component p on an empty board
+    t, color = (p-1) % 6, (p-1)//6
+    if t == 0:
+        return np.array([_bits(PAWN_ATTACKS[color][sq]) for sq in range(64)])
+    if t == 2:
+        return np.array([_bits(KNIGHT_ATTACKS[sq]) for sq in range(64)])
+    if t == 5:
+        return np.array([_bits(KING_ATTACKS[sq]) for sq in range(64)])
+    directions = {1: ORTHOGONAL, 3: DIAGONAL, 4: ORTHOGONAL+DIAGONAL}[t]
+    return np.array([_bits(functools.reduce(lambda b, d: b | RAYS[d][sq], directions, 0)) for sq in range(64)])
+
+def _pushes(color):
+    # (from, to)-pairs of pawn pushes (incl. double steps) of color in orientation white
+    d = (-8 if color == WHITE else 8)
+    start = (6 if color == WHITE else 1)
+    pushes = []
+    for sq in range(8, 56):
+        pushes.append((sq, sq+d))
+        if sq >> 3 == start:
+            pushes.append((sq, sq+2*d))
+    return pushes
+
+ATTACKS = [None]+[_attackMatrix(p) for p in range(1, 13)]
+# BETWEEN_MASK[a, b, sq] denotes whether sq is strictly in between a and b
+BETWEEN_MASK = np.array([[_bits(BETWEEN[a][b]) for b in range(64)] for a in range(64)])
+
+def parseMaterial(name):
+    """
+    Arguments:
+        name : material, eg, "KBNvK" (first side is white)
+    Return:
+        components : list of component codes, white components first, ordered as in the name
+    """
+    sides = name.upper().split("V")
+    if len(sides) != 2 or any(s.count("K") != 1 or not s.startswith("K") for s in sides):
+        raise ValueError("Invalid material {0}!".format(name))
+    components = []
+    for color, side in zip((WHITE, BLACK), sides):
+        for letter in side:
+            if letter not in LETTER_TYPES:
+                raise ValueError("Invalid material {0}!".format(name))
+            components.append(6*color+LETTER_TYPES[letter]+1)
+    return components
+
+def materialName(components):
+    # name of a list of component codes (in any order)
+    sides = []
+    for color in (WHITE, BLACK):
+        letters = [TYPE_LETTERS[(p-1) % 6] for p in components if (p-1)//6 == color]
+        sides.append("".join(sorted(letters, key=LETTERS.index)))
+    return "v".join(sides)
+
+def canonicalName(name):
+    """
+    Arguments:
+        name : material, eg, "KvKR"
+    Return:
+        name : name of the table which holds the material (stronger side first)
+        swapped : whether the colours are swapped w.r.t. the table
+    """
+    white, black = name.split("v")
+    strength = lambda side: (sum(VALUES[LETTER_TYPES[l]] for l in side), [-LETTERS.index(l) for l in side])
+    if strength(black) > strength(white):
+        return black+"v"+white, True
+    return name, False
+
+class Generator:
+    def __init__(self, log=None):
+        # generated tables (int16 negamax values, ILLEGAL for invalid positions) per canonical name
+        self.tables = {}
+        self.log = log
+
+    def getTable(self, name):
+        name, _ = canonicalName(name)
+        if name not in self.tables:
+            self.tables[name] = self.generate(name)
+        return self.tables[name]
+
+    def view(self, components):
+        """
+        Arguments:
+            components : list of component codes
+        Return:
+            values : table of components, with one axis for the player to move followed by one axis per component
+        """
+        name, swapped = canonicalName(materialName(components))
+        values = self.getTable(name)
+        order = parseMaterial(name)
+        # assign an axis of the canonical table to each component
+        axes = []
+        for p in components:
+            q = (p if not swapped else (p+6 if p <= 6 else p-6))
+            axes.append(next(i for i, c in enumerate(order) if c == q and i not in axes))
+        if swapped:
+            values = values[::-1]
+            for a in range(1, len(components)+1):
+                values = np.take(values, FLIP, axis=a)
+        return values.transpose([0]+[1+a for a in axes])
+
+    def generate(self, name):
+        """
+        Arguments:
+            name : canonical material, eg, "KBNvK"
+        Return:
+            values : int16 numpy array of negamax values, indexed by [player to move, square of component 1, ...]
+        """
+        start = time.time()
+        components = parseMaterial(name)
+        n = len(components)
+        if n > MAX_COMPONENTS:
+            raise ValueError("Tables with more than {0} components are not supported!".format(MAX_COMPONENTS))
+        colors = [(p-1)//6 for p in components]
+        pawns = [c for p, c in zip(components, colors) if (p-1) % 6 == 0]
+        if len(set(pawns)) > 1:
+            raise ValueError("Tables with pawns for both sides are not supported!")
+        shape = (64,)*n
+        # valid positions: components on different squares, pawns not on the first or last row
+        valid = np.ones(shape, dtype=bool)
+        for a in range(n):
+            for b in range(a+1, n):
+                valid &= _along(~np.eye(64, dtype=bool), (a, b), n)
+            if (components[a]-1) % 6 == 0:
+                valid &= _along(np.array([0 < sq >> 3 < 7 for sq in range(64)]), (a,), n)
+        check = [self.isChecked(components, c) for c in (BLACK, WHITE)]
+        legal = [valid & ~check[1-c] for c in (BLACK, WHITE)]
+        # best value of conversions (captures and promotions), which lead to other tables
+        conversions = [self.convert(components, c) for c in (BLACK, WHITE)]
+        values = np.where(np.array(legal), np.int16(0), np.int16(ILLEGAL))
+        iterations = 0
+        while True:
+            iterations += 1
+            new = np.empty_like(values)
+            for c in (BLACK, WHITE):
+                best = self.bestMoves(components, c, _negamax(values[1-c]), conversions[c])
+                # players without legal moves (ie, all moves lead to invalid positions) are checkmated or stalemated
+                best = np.where(best < -WIN, np.where(check[c], np.int16(-WIN), np.int16(0)), best)
+                new[c] = np.where(legal[c], best, np.int16(ILLEGAL))
+            if np.array_equal(new, values):
+                break
+            values = new
+        if self.log is not None:
+            self.log.write("{0}: {1} iterations, {2:.1f} sec.\n".format(name, iterations, time.time()-start))
+        return values
+
+    def isChecked(self, components, color):
+        # whether the king of color is attacked, per position
+        n = len(components)
+        king = components.index(6*color+6)
+        checked = np.zeros((64,)*n, dtype=bool)
+        for j, p in enumerate(components):
+            if (p-1)//6 == color:
+                continue
+            attack = _along(ATTACKS[p], (j, king), n)
+            for m in range(n):
+                if m not in (j, king):
+                    attack = attack & ~_along(BETWEEN_MASK, (j, king, m), n)
+            checked |= attack
+        return checked
+
+    def convert(self, components, color):
+        """
+        Arguments:
+            components : list of component codes
+            color : player to move
+        Return:
+            best : best negamax value of the captures and promotions of color, per position (NONE if there are none)
+        """
+        n = len(components)
+        best = np.full((64,)*n, NONE, dtype=np.int16)
+        for j, p in enumerate(components):
+            if (p-1)//6 != color:
+                continue
+            pawn = (p-1) % 6 == 0
+            last = (0 if color == WHITE else 7)
+            for m, q in enumerate(components):
+                if (q-1)//6 == color or (q-1) % 6 == 5:
+                    continue
+                rest = components[:m]+components[m+1:]
+                jq = (j if j < m else j-1)
+                for t in range(64):
+                    targets = ([6*color+pt+1 for pt in PROMOTION_TYPES] if pawn and t >> 3 == last else [p])
+                    for r in targets:
+                        values = self.view(rest[:jq]+[r]+rest[jq+1:])[1-color].take(t, axis=jq)
+                        mask = _along(ATTACKS[p][:, t], (j,), n)
+                        for k in range(n):
+                            if k not in (j, m):
+                                mask = mask & ~_along(BETWEEN_MASK[:, t, :], (j, k), n)
+                        index = [slice(None)]*n
+                        index[m] = slice(t, t+1)
+                        out = best[tuple(index)]
+                        np.maximum(out, _negamax(values).reshape(_shape(n, (j, m))), out=out, where=mask)
+            if pawn:
+                # promotions by pawn pushes
+                for f, t in _pushes(color):
+                    if t >> 3 != last:
+                        continue
+                    for pt in PROMOTION_TYPES:
+                        values = self.view(components[:j]+[6*color+pt+1]+components[j+1:])[1-color].take(t, axis=j)
+                        index = [slice(None)]*n
+                        index[j] = slice(f, f+1)
+                        out = best[tuple(index)]
+                        np.maximum(out, _negamax(values).reshape(_shape(n, (j,))), out=out)
+        return best
+
+    def bestMoves(self, components, color, values, conversions):
+        """
+        Arguments:
+            components : list of component codes
+            color : player to move
+            values : negamax values of the positions after the move (ie, with the opponent to move)
+            conversions : best values of the captures and promotions of color
+        Return:
+            best : best value over all legal moves of color, per position (NONE if there are none)
+        """
+        n = len(components)
+        best = conversions.copy()
+        for j, p in enumerate(components):
+            if (p-1)//6 != color:
+                continue
+            if (p-1) % 6 == 0:
+                last = (0 if color == WHITE else 7)
+                moves = [(f, t) for f, t in _pushes(color) if t >> 3 != last]
+            else:
+                moves = list(zip(*np.nonzero(ATTACKS[p])))
+            # views with the axis of the moving component first
+            src, dst = np.moveaxis(values, j, 0), np.moveaxis(best, j, 0)
+            for f, t in moves:
+                # moves to occupied squares lead to invalid positions, hence, only blockers have to be masked
+                between = BETWEEN_MASK[f, t]
+                if between.any():
+                    mask = functools.reduce(np.multiply.outer, [~between]*(n-1))
+                    np.maximum(dst[f], src[t], out=dst[f], where=mask)
+                else:
+                    np.maximum(dst[f], src[t], out=dst[f])
+        return best
+
+def _shape(n, axes):
+    # shape of (64,)*n with singleton axes
+    return tuple((1 if a in axes else 64) for a in range(n))
+
+def _along(array, axes, n):
+    # array with one dimension per component in axes, as view broadcastable against (64,)*n
+    order = sorted(range(len(axes)), key=lambda i: axes[i])
+    return array.transpose(order).reshape([(64 if a in axes else 1) for a in range(n)])
+
+def _negamax(values):
+    # values of positions as seen from their parents, one ply further away from mate
+    return np.sign(values).astype(np.int16)-values
+
+def toBytes(values):
+    # distance to mate plus one (0 for draws and invalid positions)
+    plies = WIN-np.abs(values.astype(np.int32))
+    resolved = (values != 0) & (values != ILLEGAL)
+    if resolved.any() and plies[resolved].max() > 254:
+        raise ValueError("Distance to mate exceeds table range!")
+    return np.where(resolved, plies+1, 0).astype(np.uint8)
+
+def generateTables(names, directory, log=None):
+    """
+    Generate tables for names (and the tables they convert to) and write them to directory.
+
+    Return:
+        names : names of the written tables
+    """
+    generator = Generator(log)
+    for name in names:
+        parseMaterial(name)
+        generator.getTable(name)
+    os.makedirs(directory, exist_ok=True)
+    for name, values in generator.tables.items():
+        with open(os.path.join(directory, name+EXTENSION), "wb") as f:
+            f.write(toBytes(values).tobytes())
+    return list(generator.tables)
+
+class Tablebases:
+    def __init__(self, directory):
+        """
+        Arguments:
+            directory : directory with tables
+        """
+        if not os.path.isdir(directory):
+            raise ValueError("Invalid tablebase directory {0}!".format(directory))
+        self.tables = {}
+        self.files = []
+        for path in sorted(glob.glob(os.path.join(directory, "*"+EXTENSION))):
+            name = os.path.basename(path)[:-len(EXTENSION)]
+            components = parseMaterial(name)
+            f = open(path, "rb")
+            if os.fstat(f.fileno()).st_size != 2*64**len(components):
+                f.close()
+                raise ValueError("Invalid table {0}!".format(path))
+            self.files.append(f)
+            self.tables[name] = (components, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        self.max_components = max((len(c) for c, _ in self.tables.values()), default=0)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def probe(self, position):
+        """
+        Arguments:
+            position : bitboard position of game
+        Return:
+            result : 1 (player to move wins), 0 (draw) or -1 (player to move loses), None if the position is not covered
+                     or illegal
+            plies : distance to mate in plies
+        """
+        if sum(position.counts) > self.max_components:
+            return None, None
+        board = position.board
+        # tables ignore castling
+        for sq, flag in CORNERS.items():
+            if (board[sq]-1) % 6 == 1 and not position.castle[flag] and not position.castle[1 if sq < 8 else 4]:
+                return None, None
+        rotate = position.orientation != "white"
+        components = [(board[sq], (63-sq if rotate else sq)) for sq in iterBits(position.occ[0] | position.occ[1])]
+        name, swapped = canonicalName(materialName([p for p, _ in components]))
+        if name not in self.tables:
+            return None, None
+        # tables store illegal positions (side not to move in check) as draws
+        if position.isChecked(1-position.color):
+            return None, None
+        order, data = self.tables[name]
+        color = position.color
+        if swapped:
+            color = 1-color
+            components = [((p+6 if p <= 6 else p-6), sq ^ 56) for p, sq in components]
+        # assign the components to the axes of the table
+        squares = [None]*len(order)
+        for p, sq in components:
+            i = next(i for i, c in enumerate(order) if c == p and squares[i] is None)
+            squares[i] = sq
+        index = color
+        for sq in squares:
+            index = index*64+sq
+        value = data[index]
+        if value == 0:
+            return 0, 0
+        plies = value-1
+        return (1 if plies % 2 == 1 else -1), plies
+
+    def close(self):
+        for _, data in self.tables.values():
+            data.close()
+        for f in self.files:
+            f.close()
+        self.tables = {}
+        self.files = []
+        self.max_components = 0
+
+if __name__=='__main__':
+    from simplechess.fen import STARTPOS, parseFen
+    parser = argparse.ArgumentParser(description="Simple Chess endgame tablebases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate")
+    generate.add_argument("material", nargs="*", default=DEFAULT_TABLES)
+    generate.add_argument("-o", "--output", dest="output", required=True)
+    probe = commands.add_parser("probe")
+    probe.add_argument("directory")
+    probe.add_argument("--fen", dest="fen", default=STARTPOS)
+    args = parser.parse_args()
+    if args.command == "generate":
+        try:
+            names = generateTables(args.material, args.output, sys.stderr)
+        except ValueError as e:
+            parser.error(str(e))
+        print("{0} tables written to {1}: {2}".format(len(names), args.output, ", ".join(names)))
+    else:
+        tablebases = Tablebases(args.directory)
+        state, ep, castle, color = parseFen(args.fen)
+        result, plies = tablebases.probe(Position.fromState(state, "white", ep, castle, color))
+        if result is None:
+            print("not covered")
+        elif result == 0:
+            print("draw")
+        else:
+            print("{0} in {1} plies".format(("win" if result == 1 else "loss"), plies))
+        tablebases.close()
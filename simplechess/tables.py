@@ -0,0 +1,66 @@
+"""
+File containing precomputed attack tables, built once at import.
+Author: Thomas Mortier
+Date: October 2026
+
+Squares are indexed as sq = row*8+col, where (row, col) is the coordinate in
+the numpy state. Each geometry is available as a bitboard (used by the
+bitboard backend) and as a tuple of coordinates (used by the logic layer).
+"""
+# ray directions as (row, col) offsets
+N, S, E, W, NE, NW, SE, SW = range(8)
+DIRECTIONS = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1, -1), (1, 1), (1, -1)]
+ORTHOGONAL = (N, S, E, W)
+DIAGONAL = (NE, NW, SE, SW)
+# directions in which the square index increases (first blocker is the least significant bit)
+POSITIVE = (S, E, SE, SW)
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def _onBoard(r, c):
+    return 0 <= r <= 7 and 0 <= c <= 7
+
+def _targets(sq, offsets):
+    r, c = divmod(sq, 8)
+    return tuple((r+dr, c+dc) for dr, dc in offsets if _onBoard(r+dr, c+dc))
+
+def _ray(sq, d):
+    r, c = divmod(sq, 8)
+    dr, dc = DIRECTIONS[d]
+    ray = []
+    r, c = r+dr, c+dc
+    while _onBoard(r, c):
+        ray.append((r, c))
+        r, c = r+dr, c+dc
+    return tuple(ray)
+
+def _bitboard(coords):
+    b = 0
+    for r, c in coords:
+        b |= 1 << (r*8+c)
+    return b
+
+# coordinate tables
+KNIGHT_COORDS = [_targets(sq, KNIGHT_OFFSETS) for sq in range(64)]
+KING_COORDS = [_targets(sq, KING_OFFSETS) for sq in range(64)]
+# pawn capture targets, indexed by [up][sq] where up denotes a pawn moving towards row 0
+PAWN_CAPTURE_COORDS = [[_targets(sq, [(1, -1), (1, 1)]) for sq in range(64)],
+                       [_targets(sq, [(-1, -1), (-1, 1)]) for sq in range(64)]]
+RAY_COORDS = [[_ray(sq, d) for sq in range(64)] for d in range(8)]
+
+# bitboard tables
+KNIGHT_ATTACKS = [_bitboard(t) for t in KNIGHT_COORDS]
+KING_ATTACKS = [_bitboard(t) for t in KING_COORDS]
+PAWN_ATTACKS = [[_bitboard(t) for t in PAWN_CAPTURE_COORDS[up]] for up in range(2)]
+RAYS = [[_bitboard(t) for t in RAY_COORDS[d]] for d in range(8)]
+
+def _between(a, b):
+    # squares strictly in between a and b if they share a row, column or diagonal
+    for d in range(8):
+        ray = RAY_COORDS[d][a]
+        if divmod(b, 8) in ray:
+            return _bitboard(ray[:ray.index(divmod(b, 8))])
+    return 0
+
+BETWEEN = [[_between(a, b) for b in range(64)] for a in range(64)]
@@ -0,0 +1,90 @@
+"""
+File containing code for the transposition table.
+Author: Thomas Mortier
+Date: October 2026
+"""
+from array import array
+
+EMPTY, EXACT, LOWER, UPPER = 0, 1, 2, 3
+
+# bytes per entry: key (8), value (8), move (2), depth (1), flag (1), age (1)
+ENTRY_SIZE = 21
+# flags are cleared in chunks of this many bytes
+CLEAR_CHUNK = bytes(1 << 16)
+
+class TranspositionTable:
+    def __init__(self, size=16, policy="depth"):
+        """
+        Arguments:
+            size : memory budget in MB
+            policy : replacement policy, either "depth" (buckets with a depth-preferred and an
+                     always-replace slot) or "always" (single-slot buckets, always replaced)
+        """
+        if policy not in ("depth", "always"):
+            raise ValueError("Unknown replacement policy {0}!".format(policy))
+        self.policy = policy
+        self.slots = (2 if policy == "depth" else 1)
+        self.buckets = max(1, (size*1024*1024)//(ENTRY_SIZE*self.slots))
+        n = self.buckets*self.slots
+        self.keys = array("Q", bytes(8*n))
+        self.values = array("d", bytes(8*n))
+        self.moves = array("H", bytes(2*n))
+        self.depths = array("b", bytes(n))
+        self.flags = array("B", bytes(n))
+        self.ages = array("B", bytes(n))
+        self.age = 0
+        self.probes, self.hits, self.stores = 0, 0, 0
+
+    def __len__(self):
+        return self.buckets*self.slots
+
+    def newSearch(self):
+        # entries of previous searches become replaceable
+        self.age = (self.age+1) & 0xFF
+
+    def clear(self):
+        # entries are marked empty in place, without allocating, as the other fields of empty slots are ignored
+        flags = memoryview(self.flags)
+        n = len(flags)
+        for i in range(0, n, len(CLEAR_CHUNK)):
+            k = min(len(CLEAR_CHUNK), n-i)
+            flags[i:i+k] = CLEAR_CHUNK[:k]
+        self.probes, self.hits, self.stores = 0, 0, 0
+
+    def probe(self, key):
+        """
+        Arguments:
+            key : Zobrist key of position
+        Return:
+            (depth, value, flag, move)-tuple or None in case of a miss
+        """
+        self.probes += 1
+        i = (key % self.buckets)*self.slots
+        for j in range(i, i+self.slots):
+            if self.keys[j] == key and self.flags[j] != EMPTY:
+                self.hits += 1
+                return self.depths[j], self.values[j], self.flags[j], self.moves[j]
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        self.stores += 1
+        i = (key % self.buckets)*self.slots
+        j = i
+        if self.slots == 2:
+            # depth-preferred slot, unless it holds a deeper entry of the current search
+            if self.keys[i] != key and self.flags[i] != EMPTY and self.ages[i] == self.age and self.depths[i] > depth:
+                j = i+1
+        self.keys[j] = key
+        self.values[j] = value
+        self.moves[j] = move
+        self.depths[j] = depth
+        self.flags[j] = flag
+        self.ages[j] = self.age
+
+    def stats(self):
+        return {
+            "entries": len(self),
+            "probes": self.probes,
+            "hits": self.hits,
+            "stores": self.stores,
+            "hitrate": (self.hits/self.probes if self.probes > 0 else 0.0)}
@@ -0,0 +1,245 @@
+"""
+File containing code for the UCI (Universal Chess Interface) front-end of the engine.
+Author: Thomas Mortier
+Date: October 2026
+
+Commands are read from stdin by the main thread, while searches run in a
+separate thread, such that stop (and isready) are handled immediately.
+
+Usage:
+    python -m simplechess.uci
+"""
+import sys
+import threading
+
+from simplechess.bitboard import Position, WHITE
+from simplechess.engine import ABPEngine, MATE, MAX_PLY, getTimeBudget
+from simplechess.fen import STARTPOS, parseFen, toUci, fromUci
+
+NAME = "Simple Chess"
+AUTHOR = "Thomas Mortier"
+# maximum depth for searches which are limited by time (or not limited at all)
+MAX_DEPTH = 64
+# UCI squares are absolute, hence, the board is always oriented with white at the bottom
+ORIENTATION = "white"
+# check options which switch selective search features of the engine
+UCI_SELECTIVE = {"nullmove": "nullmove", "latemovereductions": "lmr", "futilitypruning": "futility", "quiescence": "quiescence"}
+
+def formatScore(value):
+    # engine value (in points) as UCI score
+    if abs(value) >= MATE-MAX_PLY:
+        plies = MATE-abs(value)
+        return "mate {0}".format((plies+1)//2 if value > 0 else -((plies+1)//2))
+    return "cp {0}".format(int(round(value*100)))
+
+class UCI:
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.lock = threading.Lock()
+        self.hash_size = 16
+        self.threads = 1
+        self.book = None
+        self.tablebases = None
+        # selective search features and quiescence search of the engine
+        self.selective = {"nullmove": True, "lmr": True, "futility": True, "quiescence": True}
+        self.engine = None
+        self.position = self.parsePosition(["startpos"])
+        self.thread = None
+        # bestmove is held back until this is set (by stop or ponderhit in infinite and ponder mode)
+        self.release = threading.Event()
+        self.ponder_budget = None
+
+    def send(self, line):
+        with self.lock:
+            self.out.write(line+"\n")
+            self.out.flush()
+
+    def getEngine(self):
+        if self.engine is None:
+            try:
+                self.engine = ABPEngine("white", ORIENTATION, MAX_DEPTH, self.hash_size, threads=self.threads, book=self.book, tablebases=self.tablebases, **self.selective)
+            except (OSError, ValueError) as e:
+                self.send("info string {0}".format(e))
+                self.book, self.tablebases = None, None
+                self.engine = ABPEngine("white", ORIENTATION, MAX_DEPTH, self.hash_size, threads=self.threads, **self.selective)
+            self.engine.callback = self.report
+        return self.engine
+
+    def closeEngine(self):
+        self.wait()
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+    def run(self, stream=sys.stdin):
+        for line in stream:
+            if not self.handle(line):
+                break
+        self.stop()
+        self.closeEngine()
+
+    def handle(self, line):
+        """
+        Arguments:
+            line : command sent by the GUI
+        Return:
+            running : False if the GUI asked to quit
+        """
+        tokens = line.split()
+        if len(tokens) == 0:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name {0}".format(NAME))
+            self.send("id author {0}".format(AUTHOR))
+            self.send("option name Hash type spin default 16 min 1 max 4096")
+            self.send("option name Threads type spin default 1 min 1 max 256")
+            self.send("option name Ponder type check default false")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("option name NullMove type check default true")
+            self.send("option name LateMoveReductions type check default true")
+            self.send("option name FutilityPruning type check default true")
+            self.send("option name Quiescence type check default true")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.setOption(args)
+        elif command == "ucinewgame":
+            self.wait()
+            self.getEngine().tt.clear()
+        elif command == "position":
+            self.wait()
+            try:
+                self.position = self.parsePosition(args)
+            except ValueError as e:
+                self.send("info string {0}".format(e))
+        elif command == "go":
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            if self.engine is not None and self.ponder_budget is not None:
+                self.engine.ponderHit(self.ponder_budget)
+            self.release.set()
+        elif command == "quit":
+            return False
+        return True
+
+    def setOption(self, args):
+        # setoption name <id> [value <x>]
+        if "name" not in args:
+            return
+        i = args.index("name")
+        j = (args.index("value") if "value" in args else len(args))
+        name, value = " ".join(args[i+1:j]).lower(), " ".join(args[j+1:])
+        try:
+            if name == "hash":
+                self.closeEngine()
+                self.hash_size = max(1, int(value))
+            elif name == "threads":
+                self.closeEngine()
+                self.threads = max(1, int(value))
+            elif name == "bookfile":
+                self.closeEngine()
+                self.book = (value if value not in ("", "<empty>") else None)
+            elif name == "tablebasepath":
+                self.closeEngine()
+                self.tablebases = (value if value not in ("", "<empty>") else None)
+            elif name in UCI_SELECTIVE:
+                if value.lower() not in ("true", "false"):
+                    raise ValueError()
+                self.closeEngine()
+                self.selective[UCI_SELECTIVE[name]] = value.lower() == "true"
+        except ValueError:
+            self.send("info string invalid value {0} for option {1}".format(value, name))
+
+    def parsePosition(self, args):
+        # position [fen <fen> | startpos] [moves <move1> ... <movei>]
+        if "moves" in args:
+            i = args.index("moves")
+            args, moves = args[:i], args[i+1:]
+        else:
+            moves = []
+        if len(args) > 0 and args[0] == "startpos":
+            fen = STARTPOS
+        elif len(args) > 1 and args[0] == "fen":
+            fen = " ".join(args[1:])
+        else:
+            raise ValueError("invalid position command")
+        state, ep, castle, color = parseFen(fen, ORIENTATION)
+        position = Position.fromState(state, ORIENTATION, ep, castle, color)
+        for name in moves:
+            move = fromUci(name, ORIENTATION)
+            if move not in position.legalMoves(promotions=(0, 1, 2, 3)):
+                raise ValueError("illegal move {0}".format(name))
+            position.makeMove(move)
+        return position
+
+    def go(self, args):
+        self.wait()
+        options, flags = {}, set()
+        i = 0
+        while i < len(args):
+            if args[i] in ("infinite", "ponder"):
+                flags.add(args[i])
+                i += 1
+            else:
+                if i+1 < len(args):
+                    try:
+                        options[args[i]] = int(args[i+1])
+                    except ValueError:
+                        pass
+                i += 2
+        engine = self.getEngine()
+        engine.depth = min(options.get("depth", MAX_DEPTH), MAX_DEPTH)
+        # time budget (in sec.)
+        timeout = None
+        if "movetime" in options:
+            timeout = options["movetime"]/1000
+        else:
+            clock, inc = ("wtime", "winc") if self.position.color == WHITE else ("btime", "binc")
+            if clock in options:
+                timeout = getTimeBudget(options[clock]/1000, options.get(inc, 0)/1000, options.get("movestogo", 30))
+        self.ponder_budget = None
+        self.release.clear()
+        if "ponder" in flags:
+            # search without time budget until ponderhit, from then on the budget applies
+            self.ponder_budget, timeout = timeout, None
+        elif "infinite" not in flags:
+            self.release.set()
+        engine.prepare()
+        self.thread = threading.Thread(target=self.think, args=(self.position.copy(), timeout, options.get("nodes")), daemon=True)
+        self.thread.start()
+
+    def think(self, position, timeout, maxnodes):
+        move = self.engine.search(position, timeout, maxnodes)
+        pv = (self.engine.getPV() if move is not None else [])
+        # in infinite and ponder mode, the best move is only sent after stop or ponderhit
+        self.release.wait()
+        if move is None:
+            self.send("bestmove 0000")
+        elif len(pv) > 1:
+            self.send("bestmove {0} ponder {1}".format(toUci(move, ORIENTATION), toUci(pv[1], ORIENTATION)))
+        else:
+            self.send("bestmove {0}".format(toUci(move, ORIENTATION)))
+
+    def report(self, depth, value, nodes, elapsed, pv):
+        self.send("info depth {0} score {1} nodes {2} nps {3} time {4} pv {5}".format(
+            depth, formatScore(value), nodes, int(nodes/max(elapsed, 1e-3)), int(elapsed*1000),
+            " ".join(toUci(m, ORIENTATION) for m in pv)))
+
+    def stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+        self.release.set()
+
+    def wait(self):
+        # wait for the running search (if any) to finish
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+if __name__=='__main__':
+    UCI().run()
@@ -0,0 +1,18 @@
+"""
+File containing the Zobrist keys used for hashing positions.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import random
+
+# fixed seed, such that keys (and hence opening books or tables keyed by them) are reproducible
+_rng = random.Random(2021)
+
+# keys per component code (index 0 unused) and square
+COMPONENT_KEYS = [[_rng.getrandbits(64) for sq in range(64)] for p in range(13)]
+# keys per castle flag
+CASTLE_KEYS = [_rng.getrandbits(64) for i in range(6)]
+# keys per square of the pawn which made a double step
+EP_KEYS = [_rng.getrandbits(64) for sq in range(64)]
+# key for white to move
+COLOR_KEY = _rng.getrandbits(64)
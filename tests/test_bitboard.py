@@ -0,0 +1,57 @@
+"""
+File containing tests for the incremental state (Zobrist key, evaluation) of bitboard positions.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import pytest
+
+from simplechess.fen import STARTPOS, parseFen, fromUci
+from simplechess.bitboard import Position
+from simplechess.perft import POSITIONS
+
+FENS = [fen for name, fen, _ in POSITIONS if name in ("kiwipete", "promotions", "ep-check", "castle-rights")]
+
+def getPosition(fen, orientation):
+    state, ep, castle, color = parseFen(fen, orientation)
+    return Position.fromState(state, orientation, ep, castle, color)
+
+def snapshot(position):
+    return position.key, list(position.board), position.ep, list(position.castle), position.color, position.evaluate()
+
+def walk(position, depth):
+    # make and unmake all moves up to depth and compare the incremental key with a full computation
+    if depth == 0:
+        return
+    for m in position.legalMoves(promotions=(0, 1, 2, 3)):
+        before = snapshot(position)
+        undo = position.makeMove(m)
+        assert position.key == position.computeKey()
+        walk(position, depth-1)
+        position.unmakeMove(m, undo)
+        assert snapshot(position) == before
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+@pytest.mark.parametrize("fen", FENS)
+def testMakeUnmake(fen, orientation):
+    walk(getPosition(fen, orientation), 2)
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+def testNullMove(orientation):
+    position = getPosition(FENS[0], orientation)
+    before = snapshot(position)
+    undo = position.makeNullMove()
+    assert position.key == position.computeKey()
+    assert position.key != before[0]
+    position.unmakeNullMove(undo)
+    assert snapshot(position) == before
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+def testTransposition(orientation):
+    # different move orders which reach the same position have the same key
+    keys = []
+    for line in (["g1f3", "g8f6", "b1c3"], ["b1c3", "g8f6", "g1f3"]):
+        position = getPosition(STARTPOS, orientation)
+        for name in line:
+            position.makeMove(fromUci(name, orientation))
+        keys.append(position.key)
+    assert keys[0] == keys[1]
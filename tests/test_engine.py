@@ -0,0 +1,41 @@
+"""
+File containing tests for the alpha-beta engine.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import pytest
+
+from simplechess.fen import parseFen, toUci
+from simplechess.bitboard import Position
+from simplechess.engine import ABPEngine, MATE, MAX_PLY
+
+# back rank mate in 1 (Rd8#)
+MATE_FEN = "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"
+
+def search(fen, orientation, **params):
+    state, ep, castle, color = parseFen(fen, orientation)
+    engine = ABPEngine(color, orientation, 3, **params)
+    try:
+        move = engine.search(Position.fromState(state, orientation, ep, castle, color))
+        return toUci(move, orientation), engine.getPV(), engine.nodes
+    finally:
+        engine.close()
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+def testMate(orientation):
+    move, pv, _ = search(MATE_FEN, orientation)
+    assert move == "d1d8"
+    assert len(pv) == 1
+
+@pytest.mark.parametrize("seed", [None, 1])
+@pytest.mark.parametrize("orientation", ["white", "black"])
+def testParallel(orientation, seed):
+    # root-parallel search agrees with the single-threaded search
+    single, _, _ = search(MATE_FEN, orientation, seed=seed)
+    parallel, _, _ = search(MATE_FEN, orientation, threads=2, seed=seed)
+    assert single == parallel == "d1d8"
+
+def testParallelSeed():
+    # with a seed, the result of the root-parallel search does not depend on the timing of the workers
+    fen = "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3"
+    assert search(fen, "white", threads=2, seed=3) == search(fen, "white", threads=2, seed=3)
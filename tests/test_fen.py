@@ -0,0 +1,35 @@
+"""
+File containing tests for converting between FEN strings and game states.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import numpy as np
+import pytest
+
+from simplechess.fen import STARTPOS, parseFen, toFen, toUci, fromUci
+from simplechess.bitboard import Position
+
+FENS = [STARTPOS,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1"]
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+@pytest.mark.parametrize("fen", FENS)
+def testRoundTrip(fen, orientation):
+    # move clocks are not part of the state, hence, the FENs above use the defaults of toFen
+    state, ep, castle, color = parseFen(fen, orientation)
+    assert toFen(state, orientation, ep, castle, color) == fen
+
+def testOrientation():
+    # the board of orientation black is the board of orientation white rotated by 180 degrees
+    white, _, _, _ = parseFen(FENS[1], "white")
+    black, _, _, _ = parseFen(FENS[1], "black")
+    assert np.array_equal(white, black[::-1, ::-1])
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+def testUci(orientation):
+    state, ep, castle, color = parseFen(FENS[1], orientation)
+    position = Position.fromState(state, orientation, ep, castle, color)
+    for move in position.legalMoves(promotions=(0, 1, 2, 3)):
+        assert fromUci(toUci(move, orientation), orientation) == move
@@ -0,0 +1,17 @@
+"""
+File containing tests for move generation by means of perft.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import pytest
+
+from simplechess.perft import POSITIONS, perft
+
+TESTS = {name: (fen, counts) for name, fen, counts in POSITIONS}
+
+@pytest.mark.parametrize("backend", ["logic", "bitboard"])
+@pytest.mark.parametrize("orientation", ["white", "black"])
+@pytest.mark.parametrize("name", ["startpos", "kiwipete"])
+def testPerft(name, orientation, backend):
+    fen, counts = TESTS[name]
+    assert perft(3, fen, orientation, backend) == counts[3]
@@ -0,0 +1,41 @@
+"""
+File containing tests for endgame tablebases.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import pytest
+
+from simplechess.fen import parseFen
+from simplechess.bitboard import Position
+from simplechess.tablebase import Tablebases, generateTables
+
+@pytest.fixture(scope="module")
+def tablebases(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tb")
+    assert sorted(generateTables(["KQvK"], str(directory))) == ["KQvK", "KvK"]
+    tb = Tablebases(str(directory))
+    yield tb
+    tb.close()
+
+def getPosition(fen, orientation):
+    state, ep, castle, color = parseFen(fen, orientation)
+    return Position.fromState(state, orientation, ep, castle, color)
+
+@pytest.mark.parametrize("orientation", ["white", "black"])
+@pytest.mark.parametrize("fen, expected", [
+    # mate in 1 (Qa8#) for the player to move
+    ("6k1/8/6K1/8/8/8/8/Q7 w - - 0 1", (1, 1)),
+    # same material with colors swapped
+    ("q7/8/8/8/8/6k1/8/6K1 b - - 0 1", (1, 1)),
+    # checkmated
+    ("Q5k1/8/6K1/8/8/8/8/8 b - - 0 1", (-1, 0)),
+    # stalemate
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", (0, 0)),
+    # bare kings
+    ("8/8/3k4/8/8/3K4/8/8 w - - 0 1", (0, 0)),
+    # side not to move in check, ie, illegal
+    ("7k/8/6K1/8/8/8/8/Q7 w - - 0 1", (None, None)),
+    # material not covered
+    ("6k1/8/6K1/8/8/8/8/R7 w - - 0 1", (None, None))])
+def testProbe(tablebases, fen, expected, orientation):
+    assert tablebases.probe(getPosition(fen, orientation)) == expected
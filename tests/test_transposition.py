@@ -0,0 +1,42 @@
+"""
+File containing tests for the transposition table.
+Author: Thomas Mortier
+Date: October 2026
+"""
+import pytest
+
+from simplechess.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+@pytest.mark.parametrize("policy", ["depth", "always"])
+def testStoreProbe(policy):
+    tt = TranspositionTable(1, policy)
+    assert tt.probe(12345) is None
+    tt.store(12345, 4, 0.5, EXACT, 777)
+    assert tt.probe(12345) == (4, 0.5, EXACT, 777)
+    # other keys of the same bucket miss
+    assert tt.probe(12345+tt.buckets) is None
+    tt.store(12345, 5, -0.25, LOWER, 778)
+    assert tt.probe(12345) == (5, -0.25, LOWER, 778)
+
+def testDepthPreferred():
+    tt = TranspositionTable(1, "depth")
+    tt.store(1, 6, 1.0, EXACT, 1)
+    # a shallower entry of the same search does not replace the deeper one
+    tt.store(1+tt.buckets, 2, 2.0, UPPER, 2)
+    assert tt.probe(1) == (6, 1.0, EXACT, 1)
+    assert tt.probe(1+tt.buckets) == (2, 2.0, UPPER, 2)
+    # unless the deeper one stems from a previous search
+    tt.newSearch()
+    tt.store(1+2*tt.buckets, 1, 3.0, LOWER, 3)
+    assert tt.probe(1) is None
+    assert tt.probe(1+2*tt.buckets) == (1, 3.0, LOWER, 3)
+
+def testClear():
+    tt = TranspositionTable(1)
+    keys = list(range(1, 1000, 7))
+    for key in keys:
+        tt.store(key, 3, 0.0, EXACT, 0)
+    assert all(tt.probe(key) is not None for key in keys)
+    tt.clear()
+    assert all(tt.probe(key) is None for key in keys)
+    assert tt.stats()["stores"] == 0